@@ -12,20 +12,29 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 import os.path
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-# Quick-start development settings - unsuitable for production
+# Development settings are used by default. Production profile is turned on with DJANGO_PRODUCTION=1,
+# it requires DJANGO_SECRET_KEY and DJANGO_ALLOWED_HOSTS (comma separated) environment variables
 # See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
 
+PRODUCTION = os.environ.get('DJANGO_PRODUCTION') == '1'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-ut8gue8x0yg01=$=ak7i3$$(t@y2^@tl3-y2u51*zbk8qvjt%r'
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', '' if PRODUCTION else
+                            'django-insecure-ut8gue8x0yg01=$=ak7i3$$(t@y2^@tl3-y2u51*zbk8qvjt%r')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('DJANGO_SECRET_KEY environment variable must be set in production.')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# With DEBUG every SQL query is kept in memory and static files are served by Django
+DEBUG = os.environ.get('DJANGO_DEBUG', '0' if PRODUCTION else '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -50,6 +59,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if PRODUCTION:
+    # Static files are served by WSGI workers, right after security middleware
+    MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'exam_site.urls'
 
 TEMPLATES = [
@@ -78,10 +91,34 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Worker threads keep their connections between requests in production
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 60 if PRODUCTION else 0)),
     }
 }
 
 
+# Cache, sessions and authentication
+# Local memory cache is per process. Use shared cache (e.g. memcached) with several worker processes,
+# otherwise changed users and sessions are seen by other processes only after cache timeout
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'exams'),
+    }
+}
+
+# cached_db keeps sessions in cache and database, signed_cookies doesn't touch database at all
+SESSION_ENGINE = os.environ.get('DJANGO_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
+AUTHENTICATION_BACKENDS = ['exams.modules.auth.CachedModelBackend']
+EXAM_USER_CACHE_TIMEOUT = 300
+EXAM_CATALOGUE_CACHE_TIMEOUT = 3600
+EXAM_RESULTS_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+# Browsers don't revalidate result pages during this time, later they get 304 until exam answers change
+EXAM_RESULTS_MAX_AGE = 60 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -120,10 +157,54 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 
 STATIC_URL = '/static/'
-STATIC_ROOT = os.path.join(BASE_DIR, 'static')
-STATICFILES_DIR = [
-    os.path.join(BASE_DIR, 'static')
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# Project wide static files, besides static directories of apps
+STATICFILES_DIRS = [path for path in [os.path.join(BASE_DIR, 'static')] if os.path.isdir(path)]
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.FileSystemFinder',
+    'exams.modules.assets.TemplateReferencedFinder',
 ]
+# Bundled libraries are collected only as far as templates use them
+STATICFILES_REFERENCED_ONLY = ['bootstrap/']
+
+if PRODUCTION:
+    # collectstatic stores gzip and brotli compressed copies of files with content hash in their names.
+    # Whitenoise serves hashed files with far-future cache headers, so browsers don't request them again
+    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Uploaded exam files are kept here until background worker imports them
+
+EXAM_UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
+EXAM_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Chunked uploads without new parts for this long are removed by run_jobs worker
+
+EXAM_CHUNKED_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Running job without progress for this long is failed by run_jobs worker: worker running it was killed
+
+EXAM_JOB_STALE_TIMEOUT = 15 * 60
+
+# Number of pre-generated layouts for each question quantity, exam start picks one of them at random
+
+EXAM_LAYOUT_POOL_SIZE = 100
+
+# Answers of timed exams are accepted this long after deadline, to allow for network delays of automatic submission
+
+EXAM_DEADLINE_GRACE_SECONDS = 30
+
+# Budgets of expensive endpoints: (requests, period in seconds) per user, or per IP address for anonymous clients.
+# Requests over budget get 429 response. Buckets are kept in the default cache
+
+EXAM_RATE_LIMITS = {
+    'register': (5, 10 * 60),
+    'exam_save': (10, 60),
+    'exam_autosave': (60, 60),
+    'upload': (10, 10 * 60),
+    'chunked_upload': (600, 60),
+}
+# Take client address from X-Forwarded-For header, only when application is behind a proxy which sets it
+EXAM_RATE_LIMIT_TRUST_FORWARDED_FOR = os.environ.get('DJANGO_TRUST_FORWARDED_FOR') == '1'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
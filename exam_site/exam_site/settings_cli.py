@@ -0,0 +1,23 @@
+"""
+Lean settings for management commands and background worker, e.g.
+
+    DJANGO_SETTINGS_MODULE=exam_site.settings_cli python manage.py upload_exam questions.json
+
+Admin site, static files and messages apps are not loaded, so process starts faster.
+Use full settings for commands which need them: runserver, collectstatic, and deleting users,
+which are referenced by admin log entries
+"""
+from .settings import *  # noqa: F401, F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, TEMPLATES
+
+LEAN_SKIPPED_APPS = ['django.contrib.admin', 'django.contrib.messages', 'django.contrib.staticfiles']
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in LEAN_SKIPPED_APPS]
+
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if not middleware.startswith('django.contrib.messages.')]
+
+TEMPLATES = [dict(template, OPTIONS=dict(template['OPTIONS'], context_processors=[
+    processor for processor in template['OPTIONS']['context_processors']
+    if not processor.startswith('django.contrib.messages.')])) for template in TEMPLATES]
+
+ROOT_URLCONF = 'exam_site.urls_cli'
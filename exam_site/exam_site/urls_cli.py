@@ -0,0 +1,9 @@
+"""
+URL configuration of lean CLI settings (settings_cli): application URLs without admin site,
+so URLs can be reversed in commands
+"""
+from django.urls import include, path
+
+urlpatterns = [
+    path('exams/', include('exams.urls')),
+]
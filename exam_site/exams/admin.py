@@ -1,10 +1,21 @@
+import tempfile
+import zipfile
+
 from django.contrib import admin
 from django import forms
 from django.contrib.auth.models import Group
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.forms import ReadOnlyPasswordHashField
+from django.db.models import F
+from django.db.models.functions import Substr
+from django.http import FileResponse
 
-from .models import ApplicationUser, Question, QuestionVariant, Exam
+from .models import ApplicationUser, Job, Question, QuestionReport, QuestionVariant, Exam
+from .modules.export import ExamExport
+from .modules.jobs import JobQueue
+from .modules.paginators import EstimatedCountPaginator
+from .modules.results import ExamResultPage
 
 
 class UserCreationForm(forms.ModelForm):
@@ -57,6 +68,63 @@ class UserAdmin(BaseUserAdmin):
     filter_horizontal = ()
 
 
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Base admin for tables with many rows and long text columns.
+    Changelist doesn't count rows twice, takes count of unfiltered table from database statistics
+    and loads only first PREVIEW_LENGTH characters of truncated_fields, cut by database.
+    One more character is loaded to tell whether text was truncated
+    """
+    PREVIEW_LENGTH = 100
+    truncated_fields = ()
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        """ Returns ChangeList which defers long text columns and selects their previews instead """
+        model_admin = self
+
+        class TruncatedTextChangeList(ChangeList):
+            def get_queryset(self, request):
+                queryset = super().get_queryset(request)
+                previews = {f'{field}_preview': Substr(field, 1, model_admin.PREVIEW_LENGTH + 1)
+                            for field in model_admin.truncated_fields}
+                return queryset.defer(*model_admin.truncated_fields).annotate(**previews)
+
+        return TruncatedTextChangeList
+
+    def preview(self, obj, field: str) -> str:
+        """ Returns truncated text selected by changelist query """
+        text = getattr(obj, f'{field}_preview')
+        return text[:self.PREVIEW_LENGTH] + '...' if len(text) > self.PREVIEW_LENGTH else text
+
+
+class RegradingAdminMixin:
+    """ Queues regrading of finished attempts, when correct answers of questions are changed on admin site """
+
+    @staticmethod
+    def changes_correct_answers(form) -> bool:
+        """ Returns whether saved variant form changes set of correct answers of its question """
+        if not form.has_changed():
+            return False
+        if form.instance.pk is None:
+            return bool(form.cleaned_data.get('is_correct_answer'))
+        return 'is_correct_answer' in form.changed_data or \
+            bool(form.cleaned_data.get('DELETE') and form.initial.get('is_correct_answer'))
+
+    @staticmethod
+    def bump_results_version(question_ids) -> None:
+        """ Make cached result pages of exams of questions stale, after their answer variants were deleted """
+        for exam_id in Question.objects.filter(pk__in=set(question_ids)).values_list('exam_id', flat=True).distinct():
+            ExamResultPage.bump_version(exam_id)
+
+    def enqueue_regrading(self, request, question_ids) -> None:
+        question_ids = sorted(set(question_ids))
+        if question_ids:
+            job = JobQueue().enqueue(Job.KIND_REGRADE, {'question_ids': question_ids}, request.user)
+            self.message_user(request, f'Scores of attempts will be recomputed by background job #{job.pk}.')
+
+
 class QuestionVariantInline(admin.TabularInline):
     """ Representation of question_json answer variant for admin site """
     model = QuestionVariant
@@ -64,9 +132,11 @@ class QuestionVariantInline(admin.TabularInline):
     min_num = 2
 
 
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(RegradingAdminMixin, LargeTableAdmin):
     """ Representation of exam question_json for admin site """
-    list_display = ['exam', 'title', 'text', 'answer_explanation']
+    list_display = ['exam', 'title', 'text_preview', 'answer_explanation_preview']
+    list_select_related = ['exam']
+    truncated_fields = ['text', 'answer_explanation']
     fieldsets = [
         ('Exam', {'fields': ['exam']}),
         ('Question', {'fields': ['title', 'text']}),
@@ -74,17 +144,128 @@ class QuestionAdmin(admin.ModelAdmin):
     ]
     inlines = [QuestionVariantInline]
     list_filter = ['exam']
-    search_fields = ['exam']
+    search_fields = ['title', 'exam__title']
+    autocomplete_fields = ['exam']
+
+    @admin.display(description='Text')
+    def text_preview(self, question: Question) -> str:
+        return self.preview(question, 'text')
+
+    @admin.display(description='Answer explanation')
+    def answer_explanation_preview(self, question: Question) -> str:
+        return self.preview(question, 'answer_explanation')
+
+    def save_formset(self, request, form, formset, change) -> None:
+        """ Save answer variants and regrade attempts, if correct answers of existing question were changed """
+        changes_correct_answers = change and any(self.changes_correct_answers(variant_form)
+                                                 for variant_form in formset.forms)
+        super().save_formset(request, form, formset, change)
+        if formset.deleted_objects:
+            self.bump_results_version([form.instance.pk])
+        if changes_correct_answers:
+            self.enqueue_regrading(request, [form.instance.pk])
+
+
+class QuestionVariantAdmin(RegradingAdminMixin, LargeTableAdmin):
+    """ Representation of question answer variant for admin site """
+    list_display = ['question_title', 'choice_letter', 'text_preview', 'is_correct_answer']
+    truncated_fields = ['text']
+    search_fields = ['question__title']
+    autocomplete_fields = ['question']
+
+    def get_queryset(self, request):
+        """ Select title of the question instead of loading whole question for each variant """
+        return super().get_queryset(request).annotate(question_title=F('question__title'))
+
+    @admin.display(description='Question', ordering='question__title')
+    def question_title(self, variant: QuestionVariant) -> str:
+        return variant.question_title
+
+    @admin.display(description='Text')
+    def text_preview(self, variant: QuestionVariant) -> str:
+        return self.preview(variant, 'text')
+
+    def save_model(self, request, obj: QuestionVariant, form, change) -> None:
+        super().save_model(request, obj, form, change)
+        if change and 'is_correct_answer' in form.changed_data or not change and obj.is_correct_answer:
+            self.enqueue_regrading(request, [obj.question_id])
+
+    def delete_model(self, request, obj: QuestionVariant) -> None:
+        super().delete_model(request, obj)
+        self.bump_results_version([obj.question_id])
+        if obj.is_correct_answer:
+            self.enqueue_regrading(request, [obj.question_id])
+
+    def delete_queryset(self, request, queryset) -> None:
+        question_ids = list(queryset.values_list('question_id', flat=True))
+        correct_question_ids = list(queryset.filter(is_correct_answer=True).values_list('question_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.bump_results_version(question_ids)
+        self.enqueue_regrading(request, correct_question_ids)
+
+
+class QuestionReportAdmin(LargeTableAdmin):
+    """ Representation of question report for admin site """
+    list_display = ['pk', 'question_title', 'reporter', 'status', 'reported_on', 'text_preview']
+    list_select_related = ['reporter']
+    list_filter = ['status']
+    truncated_fields = ['text', 'resolution']
+    autocomplete_fields = ['question', 'reporter']
+
+    def get_queryset(self, request):
+        """ Select title of reported question instead of loading whole question for each report """
+        return super().get_queryset(request).annotate(question_title=F('question__title'))
+
+    @admin.display(description='Question', ordering='question__title')
+    def question_title(self, report: QuestionReport) -> str:
+        return report.question_title
+
+    @admin.display(description='Text')
+    def text_preview(self, report: QuestionReport) -> str:
+        return self.preview(report, 'text')
 
 
 class ExamAdmin(admin.ModelAdmin):
     """ Representation of exam for admin site """
     list_display = ['title']
     search_fields = ['title']
+    actions = ['export_as_json', 'export_as_compressed_ndjson', 'generate_layouts']
+
+    @staticmethod
+    def export_response(queryset, exam_export: ExamExport) -> FileResponse:
+        """ Return file with exported exam, or zip archive of files if several exams are selected """
+        exams = list(queryset.only('pk', 'title'))
+        file = tempfile.TemporaryFile()
+        if len(exams) == 1:
+            exam_export.write(exams[0], file)
+            filename = exam_export.get_filename(exams[0])
+        else:
+            with zipfile.ZipFile(file, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for exam in exams:
+                    with archive.open(exam_export.get_filename(exam), 'w') as archive_file:
+                        exam_export.write(exam, archive_file)
+            filename = 'exams.zip'
+        file.seek(0)
+        return FileResponse(file, as_attachment=True, filename=filename)
+
+    @admin.action(description='Export selected exams as JSON')
+    def export_as_json(self, request, queryset) -> FileResponse:
+        return self.export_response(queryset, ExamExport('json'))
+
+    @admin.action(description='Export selected exams as gzip compressed NDJSON')
+    def export_as_compressed_ndjson(self, request, queryset) -> FileResponse:
+        return self.export_response(queryset, ExamExport('ndjson', 'gzip'))
+
+    @admin.action(description='Pre-generate layouts of selected exams')
+    def generate_layouts(self, request, queryset) -> None:
+        job = JobQueue().enqueue(Job.KIND_GENERATE_LAYOUTS, {'exam_ids': list(queryset.values_list('pk', flat=True))},
+                                 request.user)
+        self.message_user(request, f'Layouts will be generated by background job #{job.pk}.')
 
 
 admin.site.register(ApplicationUser, UserAdmin)
 admin.site.unregister(Group)
 admin.site.register(Exam, ExamAdmin)
 admin.site.register(Question, QuestionAdmin)
-admin.site.register(QuestionVariant)
+admin.site.register(QuestionVariant, QuestionVariantAdmin)
+admin.site.register(QuestionReport, QuestionReportAdmin)
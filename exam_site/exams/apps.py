@@ -5,3 +5,7 @@ class ExamsConfig(AppConfig):
     """ Auto-generated application config """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'exams'
+
+    def ready(self):
+        """ Connect signal receivers """
+        from . import signals  # noqa: F401
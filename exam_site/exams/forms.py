@@ -1,8 +1,11 @@
 from django import forms
 from django.core.exceptions import ValidationError
 
-from .models import ApplicationUser, Question, QuestionReport
-from .modules.exams import ExamCreate
+from .models import ApplicationUser, ChunkedUpload, Job, Question, QuestionReport
+from .modules.formats import get_parser_for_filename, supported_extensions
+from .modules.jobs import JobQueue
+from .modules.reports import ReportTriage
+from .modules.uploads import start_chunked_upload, store_upload
 
 
 class RegistrationForm(forms.ModelForm):
@@ -41,26 +44,46 @@ class UploadForm(forms.Form):
         super(UploadForm, self).__init__(*args, **kwargs)
 
     def clean(self):
-        """
-        Get exam title and JSON file with questions from form.
-        Parse the file, create new exam, questions and question_json answer variants.
-        In case of exceptions raised, they should be passed to form view without saving exam data.
-        """
+        """ Get exam title and file with questions from form and check file format """
         cleaned_data = super(UploadForm, self).clean()
-        exam_title = cleaned_data.get('exam_title')
-        exam_source = cleaned_data.get('exam_source', None)
-        try:
-            file = cleaned_data.get('questions_file')
-            if file.content_type != 'application/json':
-                raise ValidationError('Question file must be in JSON format')
-            exam_create = ExamCreate()
-            parsing_errors = exam_create.create_exam(exam_title, file, exam_source, is_user_uploaded=True,
-                                                     uploader=self.uploader)
-            if parsing_errors:
-                for error in parsing_errors:
-                    self.add_error(None, error)
-        except AttributeError:
+        file = cleaned_data.get('questions_file')
+        if file is None:
             self.add_error(None, ValidationError('File with questions data wasn\'t provided.'))
+        elif get_parser_for_filename(file.name) is None:
+            self.add_error(None, ValidationError(
+                f'Question file must have one of extensions: {supported_extensions()}'))
+        return cleaned_data
+
+    def enqueue(self) -> Job:
+        """
+        Save uploaded file and add background job that parses it and creates exam, questions and answer variants.
+        Parsing errors are stored in the job and shown on job status page.
+        """
+        file = self.cleaned_data['questions_file']
+        path = store_upload(file)
+        payload = {'path': path, 'filename': file.name, 'title': self.cleaned_data['exam_title'],
+                   'source': self.cleaned_data.get('exam_source', ''), 'uploader': str(self.uploader)}
+        return JobQueue().enqueue(Job.KIND_UPLOAD, payload, user=self.uploader)
+
+
+class ChunkedUploadStartForm(forms.Form):
+    """ Form for starting upload of exam file in several parts """
+    exam_title = forms.CharField(label='Exam title', max_length=200)
+    exam_source = forms.CharField(label='Source of exam', max_length=200, required=False)
+    filename = forms.CharField(label='File name', max_length=255)
+    size = forms.IntegerField(label='File size', min_value=1)
+    checksum = forms.RegexField(label='SHA-256 of file', regex=r'^[0-9a-fA-F]{64}$', required=False)
+
+    def clean_filename(self) -> str:
+        """ Verify file format is supported """
+        filename = self.cleaned_data['filename']
+        if get_parser_for_filename(filename) is None:
+            raise ValidationError(f'Question file must have one of extensions: {supported_extensions()}')
+        return filename
+
+    def start(self, owner: ApplicationUser) -> ChunkedUpload:
+        """ Register new chunked upload """
+        return start_chunked_upload(owner, **self.cleaned_data)
 
 
 class QuestionReportCreateUpdateForm(forms.ModelForm):
@@ -82,3 +105,30 @@ class QuestionReportUpdateFormAdmin(forms.ModelForm):
 
     resolution = forms.CharField(label='Report text')
     status = forms.CharField(label='Status')
+
+
+class ReportBulkActionForm(forms.Form):
+    """ Form for resolving or folding several reports from admin's report queue """
+    ACTION_ACCEPT = 'accept'
+    ACTION_REJECT = 'reject'
+    ACTION_FOLD = 'fold'
+    ACTION_VALUES = ((ACTION_ACCEPT, 'Accept'), (ACTION_REJECT, 'Reject'), (ACTION_FOLD, 'Fold duplicates'))
+    action = forms.ChoiceField(choices=ACTION_VALUES)
+    resolution = forms.CharField(label='Resolution', required=False)
+    report_ids = forms.ModelMultipleChoiceField(queryset=QuestionReport.objects.only('pk', 'question_id'),
+                                                required=False)
+    question_ids = forms.ModelMultipleChoiceField(queryset=Question.objects.only('pk'), required=False)
+
+    def apply(self) -> int:
+        """ Apply chosen action with bulk UPDATE queries. Returns number of changed reports """
+        triage = ReportTriage()
+        action = self.cleaned_data['action']
+        reports = self.cleaned_data['report_ids']
+        question_ids = [question.pk for question in self.cleaned_data['question_ids']]
+        if action == self.ACTION_FOLD:
+            question_ids.extend(report.question_id for report in reports)
+            return triage.fold_duplicates(question_ids) if question_ids else 0
+        status = QuestionReport.STATUS_ACCEPTED if action == self.ACTION_ACCEPT else QuestionReport.STATUS_REJECTED
+        resolution = self.cleaned_data['resolution']
+        return triage.resolve([report.pk for report in reports], status, resolution) + \
+            triage.resolve_questions(question_ids, status, resolution)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from exams.modules.attempts import expire_attempts
+
+
+class Command(BaseCommand):
+    """ Django cmd command finishing expired timed exam attempts """
+    help = 'Finish timed exam attempts, which deadline has passed, with autosaved answers (run_jobs does it as well)'
+
+    def handle(self, *args, **options):
+        """ Execute command """
+        self.stdout.write(f'Finished {expire_attempts()} expired exam attempts')
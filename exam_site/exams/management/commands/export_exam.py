@@ -0,0 +1,54 @@
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from exams.models import Exam
+from exams.modules.export import COMPRESSION_EXTENSIONS, WRITERS, ExamExport
+
+
+class Command(BaseCommand):
+    """ Django cmd command for exam data export """
+    help = 'Export exams to files, which can be uploaded back with upload_exam command'
+
+    def add_arguments(self, parser: ArgumentParser):
+        """ Adds cmd arguments to command"""
+        parser.add_argument('exam_ids', nargs='*', type=int, help='IDs of exams to export')
+        parser.add_argument('--all', action='store_true', help='Export all exams')
+        parser.add_argument('--format', action='store', choices=sorted(WRITERS), default='json', help='File format')
+        parser.add_argument('--compress', action='store', choices=sorted(COMPRESSION_EXTENSIONS),
+                            help='Compress exported files')
+        parser.add_argument('--output-dir', action='store', default='.', help='Directory to write files to')
+        parser.add_argument('--parallel', action='store', type=int, default=1,
+                            help='Number of exams exported simultaneously')
+
+    def handle(self, *args, **options):
+        """ Execute command """
+        exams = Exam.objects.order_by('pk')
+        if not options['all']:
+            if not options['exam_ids']:
+                raise CommandError('Provide exam IDs or --all')
+            exams = exams.filter(pk__in=options['exam_ids'])
+        try:
+            exam_export = ExamExport(options['format'], options['compress'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        os.makedirs(options['output_dir'], exist_ok=True)
+
+        exams = exams.only('pk', 'title')
+        if options['parallel'] <= 1:
+            for exam in exams:
+                self.stdout.write(exam_export.export_to_directory(exam, options['output_dir']))
+            return
+
+        def export_in_thread(exam: Exam) -> str:
+            """ Export exam using thread's own database connection, which is closed afterwards """
+            try:
+                return exam_export.export_to_directory(exam, options['output_dir'])
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['parallel']) as executor:
+            for path in executor.map(export_in_thread, exams):
+                self.stdout.write(path)
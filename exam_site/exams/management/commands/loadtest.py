@@ -0,0 +1,63 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+from typing import List, Optional, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """ Django cmd command for load testing of running server """
+    help = 'Send concurrent GET requests to running server and report requests per second and latency'
+
+    def add_arguments(self, parser: ArgumentParser):
+        """ Adds cmd arguments to command"""
+        parser.add_argument('paths', nargs='*', default=['/'], help='Paths requested in turn')
+        parser.add_argument('--base-url', action='store', default='http://127.0.0.1:8000',
+                            help='Address of the server')
+        parser.add_argument('--requests', action='store', type=int, default=1000, help='Total number of requests')
+        parser.add_argument('--concurrency', action='store', type=int, default=10,
+                            help='Number of simultaneous requests')
+        parser.add_argument('--timeout', action='store', type=float, default=30, help='Request timeout in seconds')
+
+    @staticmethod
+    def request(url: str, timeout: float) -> Tuple[float, Optional[str]]:
+        """ Request url and returns response time and error, if any """
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                response.read()
+            error = None
+        except (urllib.error.URLError, OSError) as e:
+            error = str(e)
+        return time.perf_counter() - started, error
+
+    def handle(self, *args, **options):
+        """ Execute command """
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+        base_url = options['base_url'].rstrip('/')
+        urls = [base_url + '/' + path.lstrip('/') for path in options['paths']]
+        urls = list(islice(cycle(urls), options['requests']))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(lambda url: self.request(url, options['timeout']), urls))
+        elapsed = time.perf_counter() - started
+
+        latencies: List[float] = sorted(latency * 1000 for latency, error in results if error is None)
+        errors = [error for _, error in results if error is not None]
+        self.stdout.write(f'Requests:      {len(results)} ({len(errors)} failed), '
+                          f'concurrency {options["concurrency"]}')
+        self.stdout.write(f'Time:          {elapsed:.2f} s')
+        self.stdout.write(f'Requests/sec:  {len(latencies) / elapsed:.1f}')
+        if latencies:
+            percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(f'Latency, ms:   mean {statistics.mean(latencies):.1f}, p50 {percentiles[49]:.1f}, '
+                              f'p95 {percentiles[94]:.1f}, p99 {percentiles[98]:.1f}, max {latencies[-1]:.1f}')
+        if errors:
+            self.stdout.write(self.style.WARNING(f'First error: {errors[0]}'))
@@ -0,0 +1,89 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_TIME_RE = re.compile(r'^import time:\s*(\d+)\s*\|\s*\d+\s*\|\s*(\S+)')
+SETUP_SCRIPT = ('import time, django; started = time.perf_counter(); django.setup(); '
+                'print(round((time.perf_counter() - started) * 1000, 1))')
+
+
+class Command(BaseCommand):
+    """ Django cmd command measuring cold start of management commands and WSGI application """
+    help = 'Measure cold start time of upload_exam command and WSGI application in fresh Python processes, ' \
+           'report app-ready time and slowest imports. Compare settings with --settings-modules, ' \
+           'and other checkout of the project (e.g. baseline) with --project-dir'
+    project_dir = None
+
+    def add_arguments(self, parser: ArgumentParser):
+        """ Adds cmd arguments to command"""
+        parser.add_argument('--settings-modules', nargs='+',
+                            default=['exam_site.settings', 'exam_site.settings_cli'],
+                            help='Settings modules to compare')
+        parser.add_argument('--wsgi-settings-module', default='exam_site.settings',
+                            help='Settings module web server runs with, WSGI application is timed only with it')
+        parser.add_argument('--project-dir', default=settings.BASE_DIR,
+                            help='Directory with manage.py of project checkout to measure')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of runs, median time is reported')
+        parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to show')
+
+    def run(self, args: List[str], settings_module: str) -> Tuple[float, subprocess.CompletedProcess]:
+        """ Run Python in new process from project directory, returns wall time in milliseconds and result """
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable] + args, cwd=self.project_dir, env=env, capture_output=True,
+                                text=True)
+        elapsed = (time.perf_counter() - started) * 1000
+        if result.returncode:
+            raise CommandError(f'{" ".join(args)} failed:\n{result.stderr[-2000:]}')
+        return elapsed, result
+
+    def median_time(self, args: List[str], settings_module: str, repeat: int) -> float:
+        return statistics.median(self.run(args, settings_module)[0] for _ in range(repeat))
+
+    @staticmethod
+    def parse_import_times(stderr: str) -> Dict[str, int]:
+        """
+        Returns import time in microseconds by package from -X importtime output. Own time of modules is summed
+        by first three components of their names (e.g. django.contrib.admin), so nested imports are not counted twice
+        """
+        packages: Dict[str, int] = {}
+        for line in stderr.splitlines():
+            match = IMPORT_TIME_RE.match(line)
+            if match:
+                package = '.'.join(match.group(2).split('.')[:3])
+                packages[package] = packages.get(package, 0) + int(match.group(1))
+        return packages
+
+    def handle(self, *args, **options):
+        """ Execute command """
+        self.project_dir = options['project_dir']
+        commands = {
+            'upload_exam --help': ['manage.py', 'upload_exam', '--help'],
+            'run_jobs --help': ['manage.py', 'run_jobs', '--help'],
+        }
+        for settings_module in options['settings_modules']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{settings_module} ({self.project_dir})'))
+            setup_times = [float(self.run(['-c', SETUP_SCRIPT], settings_module)[1].stdout)
+                           for _ in range(options['repeat'])]
+            self.stdout.write(f'  {"django.setup() (app ready)":<28}{statistics.median(setup_times):8.1f} ms')
+            targets = dict(commands)
+            # Web server runs only with its own settings, lean ones drop apps it needs
+            if settings_module == options['wsgi_settings_module']:
+                targets['WSGI application'] = ['-c', 'import exam_site.wsgi']
+            for name, target_args in targets.items():
+                elapsed = self.median_time(target_args, settings_module, options['repeat'])
+                self.stdout.write(f'  {name:<28}{elapsed:8.1f} ms')
+
+            _, result = self.run(['-X', 'importtime', '-c', 'import django; django.setup()'], settings_module)
+            packages = sorted(self.parse_import_times(result.stderr).items(), key=lambda item: -item[1])
+            self.stdout.write('  Slowest imports during django.setup():')
+            for package, microseconds in packages[:options['top']]:
+                self.stdout.write(f'    {package:<40}{microseconds / 1000:8.1f} ms')
@@ -0,0 +1,29 @@
+from argparse import ArgumentParser
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.modules.regrading import Regrading
+
+
+class Command(BaseCommand):
+    """ Django cmd command for exam attempts regrading """
+    help = 'Recompute scores of exam attempts by current correct answers of questions'
+
+    def add_arguments(self, parser: ArgumentParser):
+        """ Adds cmd arguments to command"""
+        parser.add_argument('--question', action='append', type=int, dest='question_ids',
+                            help='ID of changed question, may be repeated')
+        parser.add_argument('--exam', action='store', type=int, dest='exam_id', help='Regrade all attempts of exam')
+        parser.add_argument('--all', action='store_true', help='Regrade all attempts')
+        parser.add_argument('--batch-size', action='store', type=int, default=Regrading.BATCH_SIZE,
+                            help='Number of attempts graded at once')
+
+    def handle(self, *args, **options):
+        """ Execute command """
+        if not (options['question_ids'] or options['exam_id'] or options['all']):
+            raise CommandError('Provide --question, --exam or --all')
+
+        def report_progress(processed: int, total: int) -> None:
+            self.stdout.write(f'Regraded {processed} of {total} attempts')
+
+        changed = Regrading(options['batch_size'], report_progress).regrade(options['question_ids'], options['exam_id'])
+        self.stdout.write(self.style.SUCCESS(f'Scores of {changed} attempts changed'))
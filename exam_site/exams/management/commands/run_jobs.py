@@ -0,0 +1,64 @@
+import time
+from argparse import ArgumentParser
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+
+from exams.modules.attempts import expire_attempts
+from exams.modules.jobs import JobQueue
+from exams.modules.uploads import remove_expired_uploads
+
+
+class Command(BaseCommand):
+    """ Django cmd command running background job worker """
+    help = 'Process queued background jobs (exam uploads etc.)'
+
+    def add_arguments(self, parser: ArgumentParser):
+        """ Adds cmd arguments to command"""
+        parser.add_argument('--once', action='store_true', help='Process queued jobs and exit when queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait before checking empty queue again')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='Exit after processing this number of jobs (0 - no limit)')
+        parser.add_argument('--expire-interval', type=float, default=30.0,
+                            help='Seconds between sweeps finishing expired timed exam attempts, failing jobs '
+                                 'of killed workers and removing abandoned uploads (0 - no sweeps)')
+
+    def sweep(self, queue: JobQueue) -> None:
+        """ Finish expired exam attempts, fail stale jobs and remove abandoned uploads. Failed sweep is retried """
+        try:
+            expired = expire_attempts()
+            stale = queue.fail_stale()
+            removed_uploads = remove_expired_uploads()
+        except DatabaseError as e:
+            # Attempts which weren't recorded stay in progress and are retried by the next sweep
+            self.stderr.write(f'Sweep failed: {e}')
+            return
+        if expired:
+            self.stdout.write(f'Finished {expired} expired exam attempts')
+        if stale:
+            self.stdout.write(f'Failed {stale} jobs of stopped workers')
+        if removed_uploads:
+            self.stdout.write(f'Removed {removed_uploads} abandoned chunked uploads')
+
+    def handle(self, *args, **options):
+        """ Execute command """
+        queue = JobQueue()
+        processed = 0
+        next_sweep = time.monotonic()
+        try:
+            while not options['max_jobs'] or processed < options['max_jobs']:
+                if options['expire_interval'] and time.monotonic() >= next_sweep:
+                    self.sweep(queue)
+                    next_sweep = time.monotonic() + options['expire_interval']
+                job = queue.run_next()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                processed += 1
+                self.stdout.write(f'{job}')
+                if job.error:
+                    self.stdout.write(job.error)
+        except KeyboardInterrupt:
+            pass
@@ -2,6 +2,7 @@ from argparse import ArgumentParser
 from django.core.management.base import BaseCommand
 
 from exams.modules.exams import ExamCreate
+from exams.modules.formats import PARSERS
 
 
 class Command(BaseCommand):
@@ -10,9 +11,12 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser: ArgumentParser):
         """ Adds cmd arguments to command"""
-        parser.add_argument('questions_file', nargs='?', type=str, help='Name of a JSON file with questions')
+        parser.add_argument('questions_file', nargs='?', type=str,
+                            help='Name of a JSON, NDJSON or CSV file with questions, may be gzip or zstd compressed')
         parser.add_argument('--title', action='store', help='Title of an exam')
         parser.add_argument('--source', action='store', help='Exam source')
+        parser.add_argument('--format', action='store', choices=sorted(PARSERS),
+                            help='File format. By default detected by file extension or contents')
 
     def handle(self, *args, **options):
         """ Execute command """
@@ -24,10 +28,10 @@ class Command(BaseCommand):
             exam_source = input('Enter the exam source: ')
 
         file_name = options.get('questions_file')
-        file_with_questions = open(file_name, 'r')
-
-        exam_create = ExamCreate()
-        errors = exam_create.create_exam(exam_title, file_with_questions)
+        with open(file_name, 'rb') as file_with_questions:
+            exam_create = ExamCreate()
+            errors = exam_create.create_exam(exam_title, file_with_questions, exam_source,
+                                             file_format=options.get('format'))
         if errors:
             for error in errors:
                 print(error)
@@ -1,7 +1,17 @@
+import os
+import time
 from datetime import datetime
 
+from django.conf import settings
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
+from django.core import signing
 from django.db import models
+from django.utils import timezone
+
+
+def new_cache_version() -> int:
+    """ Returns initial version of cached data. Starts from current time, so versions are not reused after reset """
+    return int(time.time() * 1000)
 
 
 class ApplicationUserManager(BaseUserManager):
@@ -61,6 +71,17 @@ class Exam(models.Model):
     source = models.CharField(max_length=200, blank=True)
     is_user_uploaded = models.BooleanField(default=False)
     uploader = models.CharField(max_length=200, blank=True)
+    layout_pool_size = models.IntegerField(default=0)
+    duration_minutes = models.PositiveIntegerField(null=True, blank=True, help_text='Leave empty for untimed exam')
+    # Version of cached result pages of exam, bumped when its questions or answers are changed
+    results_version = models.BigIntegerField(default=new_cache_version, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['title']),
+            models.Index(fields=['source', 'title']),
+            models.Index(fields=['uploader', 'title']),
+        ]
 
     def __str__(self) -> str:
         return str(self.title)
@@ -85,8 +106,30 @@ class ExamResults(models.Model):
     unique_id = models.CharField(max_length=100)
     exam = models.ForeignKey(Exam, on_delete=models.DO_NOTHING)
     user = models.ForeignKey(ApplicationUser, on_delete=models.DO_NOTHING)
+    STATUS_IN_PROGRESS = 'P'
+    STATUS_FINISHED = 'F'
+    STATUS_VALUES = ((STATUS_IN_PROGRESS, 'in progress'), (STATUS_FINISHED, 'finished'))
     taken_on = CustomDateTimeField(unique=True)
     score = models.IntegerField(default=0)
+    status = models.CharField(max_length=1, choices=STATUS_VALUES, default=STATUS_FINISHED)
+    # Timed attempts only: answers are autosaved until submission or deadline
+    started_on = models.DateTimeField(null=True, blank=True)
+    deadline = models.DateTimeField(null=True, blank=True)
+    answers = models.JSONField(default=dict, blank=True)
+    # Timed attempts only: questions served to user as [question id, choice letters in the order they are shown]
+    questions = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-taken_on']),
+            # Expiry sweep reads only attempts in progress
+            models.Index(fields=['deadline'], condition=models.Q(status='P'), name='exam_results_open_deadline'),
+        ]
+        constraints = [
+            # User may have only one timed attempt of exam in progress, so attempts can't be run in parallel
+            models.UniqueConstraint(fields=['exam', 'user'], condition=models.Q(status='P'),
+                                    name='exam_results_one_open_attempt'),
+        ]
 
     def __str__(self):
         return f'{self.exam.title} / user {self.user.username} ({self.taken_on})'
@@ -123,6 +166,10 @@ class QuestionRecorded(models.Model):
     exam_result = models.ForeignKey(ExamResults, on_delete=models.DO_NOTHING)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
 
+    class Meta:
+        # Attempts including a question are found by regrading without reading the table
+        indexes = [models.Index(fields=['question', 'exam_result'])]
+
     def __str__(self):
         return f'{self.question} / {self.exam_result}'
 
@@ -133,16 +180,40 @@ class QuestionReport(models.Model):
     STATUS_ACCEPTED = 'A'
     STATUS_REJECTED = 'R'
     STATUS_VALUES = ((STATUS_NEW, 'new'), (STATUS_ACCEPTED, 'accepted'), (STATUS_REJECTED, 'rejected'))
+    PRIORITY_NEW = 0
+    PRIORITY_RESOLVED = 1
     question = models.ForeignKey(Question, on_delete=models.DO_NOTHING)
     reporter = models.ForeignKey(ApplicationUser, on_delete=models.DO_NOTHING)
     reported_on = CustomDateTimeField(auto_now_add=True, unique=True)
     text = models.TextField()
     resolution = models.TextField(default='')
     status = models.CharField(max_length=1, choices=STATUS_VALUES, default=STATUS_NEW)
+    priority = models.SmallIntegerField(default=PRIORITY_NEW)
+    duplicate_of = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL,
+                                     related_name='duplicates')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['priority', '-reported_on']),
+            models.Index(fields=['status', 'priority']),
+            models.Index(fields=['question', 'status']),
+        ]
 
     def __str__(self):
         return f'Report {self.pk}/ reporter: {self.reporter.username} / question: {self.question}'
 
+    def save(self, *args, **kwargs):
+        self.priority = self.priority_for_status(self.status)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'priority'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def priority_for_status(cls, status: str) -> int:
+        """ Returns priority stored with report, so triage queue is ordered by index instead of CASE expression """
+        return cls.PRIORITY_NEW if status == cls.STATUS_NEW else cls.PRIORITY_RESOLVED
+
     @property
     def is_resolved(self) -> bool:
         """ Determine whether report was resolved by admin or not """
@@ -168,3 +239,156 @@ class QuestionVariantAnswerRecorded(models.Model):
 
     def __str__(self):
         return f'{self.question_variant} / {self.question_recorded}'
+
+
+class Job(models.Model):
+    """ Model for background job processed by worker (see run_jobs command) """
+    STATUS_QUEUED = 'Q'
+    STATUS_RUNNING = 'R'
+    STATUS_DONE = 'D'
+    STATUS_FAILED = 'F'
+    STATUS_VALUES = ((STATUS_QUEUED, 'queued'), (STATUS_RUNNING, 'running'), (STATUS_DONE, 'done'),
+                     (STATUS_FAILED, 'failed'))
+    KIND_UPLOAD = 'upload'
+    KIND_GENERATE_LAYOUTS = 'generate_layouts'
+    KIND_REGRADE = 'regrade'
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=1, choices=STATUS_VALUES, default=STATUS_QUEUED)
+    progress = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    error = models.TextField(default='')
+    created_by = models.ForeignKey(ApplicationUser, null=True, blank=True, on_delete=models.SET_NULL)
+    created_on = models.DateTimeField(auto_now_add=True)
+    started_on = models.DateTimeField(null=True, blank=True)
+    # Updated by worker when job is claimed and on progress, job without heartbeat for long is failed as stale
+    heartbeat_on = models.DateTimeField(null=True, blank=True)
+    finished_on = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_on'])]
+
+    def __str__(self):
+        return f'Job {self.pk} / {self.kind} ({self.get_status_display()})'
+
+    @property
+    def is_finished(self) -> bool:
+        """ Determine whether worker is done with the job, successfully or not """
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    @property
+    def percent_done(self) -> int:
+        """ Returns job progress in percents """
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.total:
+            return 0
+        return int(self.progress / self.total * 100)
+
+    def set_progress(self, progress: int, total: int = None) -> None:
+        """ Save job progress without touching other fields, so it is cheap to call from handlers """
+        self.progress = progress
+        fields = {'progress': progress, 'heartbeat_on': timezone.now()}
+        if total is not None:
+            self.total = total
+            fields['total'] = total
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+
+class ChunkedUpload(models.Model):
+    """ Model for exam file uploaded in several parts, which can be resumed after failure """
+    upload_id = models.CharField(max_length=32, unique=True)
+    owner = models.ForeignKey(ApplicationUser, on_delete=models.CASCADE)
+    exam_title = models.CharField(max_length=200)
+    exam_source = models.CharField(max_length=200, blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True)
+    job = models.ForeignKey(Job, null=True, blank=True, on_delete=models.SET_NULL)
+    created_on = models.DateTimeField(auto_now_add=True)
+    # Time of the last received part, uploads abandoned for EXAM_CHUNKED_UPLOAD_EXPIRY are removed by worker
+    updated_on = models.DateTimeField(default=timezone.now)
+    completed_on = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Upload {self.upload_id} / {self.filename} ({self.offset} of {self.size} bytes)'
+
+    @property
+    def path(self) -> str:
+        """ Path of the file parts are written to """
+        return os.path.join(settings.EXAM_UPLOAD_DIR, f'{self.upload_id}.part')
+
+    @property
+    def is_complete(self) -> bool:
+        """ Determine whether all parts were uploaded and file was passed to importer """
+        return self.completed_on is not None
+
+
+class ExamLayout(models.Model):
+    """
+    Model for pre-generated exam: shuffled questions with shuffled answer variants.
+    Layout is stored as list of [question id, original choice letters in the order they are shown]
+    """
+    DISPLAY_LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    SIGNING_SALT = 'exams.ExamLayout'
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
+    question_quantity = models.IntegerField()
+    slot = models.IntegerField()
+    layout = models.JSONField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['exam', 'question_quantity', 'slot'],
+                                               name='unique_exam_layout_slot')]
+
+    def __str__(self):
+        return f'{self.exam_id} / {self.question_quantity} questions / layout {self.slot}'
+
+    @property
+    def signed_layout(self) -> str:
+        """
+        Layout signed for exam form. Answers are decoded with layout posted back with them,
+        so attempt in progress is not affected when pool is regenerated
+        """
+        return signing.dumps([self.exam_id, self.layout], salt=self.SIGNING_SALT, compress=True)
+
+    @classmethod
+    def from_signed_layout(cls, signed_layout: str, exam_id: int) -> 'ExamLayout':
+        """ Returns unsaved layout of exam from signed one, raises BadSignature if it was tampered with """
+        layout_exam_id, layout = signing.loads(signed_layout, salt=cls.SIGNING_SALT)
+        if layout_exam_id != exam_id:
+            raise signing.BadSignature('Layout of another exam')
+        return cls(exam_id=exam_id, question_quantity=len(layout), layout=layout)
+
+    def decode_answers(self, answers: dict) -> dict:
+        """ Map letters of answer variants shown to user back to original choice letters """
+        original_letters = {question_id: letters for question_id, letters in self.layout}
+        decoded_answers = {}
+        for question_id, display_letters in answers.items():
+            letters = original_letters.get(question_id, '')
+            decoded_answers[question_id] = [letters[self.DISPLAY_LETTERS.index(letter)] for letter in display_letters
+                                            if letter in self.DISPLAY_LETTERS[:len(letters)]]
+        return decoded_answers
+
+
+class CacheVersion(models.Model):
+    """
+    Version of cached data, which is not tied to single row, e.g. exam catalogue. Versions are stored in database,
+    so change made by background worker makes cached data of web processes stale, whatever cache backend is used
+    """
+    key = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=new_cache_version)
+
+    def __str__(self):
+        return f'{self.key} / {self.version}'
+
+    @classmethod
+    def get_version(cls, key: str) -> int:
+        """ Returns current version of key """
+        return cls.objects.get_or_create(key=key)[0].version
+
+    @classmethod
+    def bump_version(cls, key: str) -> None:
+        """ Make data cached under current version of key stale """
+        if not cls.objects.filter(key=key).update(version=models.F('version') + 1):
+            cls.objects.get_or_create(key=key)
@@ -0,0 +1,72 @@
+import os
+import posixpath
+import re
+from typing import Iterator, Set, Tuple
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.storage import Storage
+from django.template import engines
+
+STATIC_TAG_RE = re.compile(r'{%\s*static\s+[\'"]([^\'"]+)[\'"]')
+CSS_URL_RE = re.compile(r'url\([\'"]?\s*([^\'")]+?)\s*[\'"]?\)|@import\s*[\'"]\s*([^\'"]+)[\'"]')
+
+
+def iter_template_files() -> Iterator[str]:
+    """ Yield paths of all templates of Django template engines, including templates of installed apps """
+    for engine in engines.all():
+        for directory in getattr(engine, 'template_dirs', ()):
+            for root, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    yield os.path.join(root, filename)
+
+
+def get_template_references() -> Set[str]:
+    """ Returns static file paths used with {% static %} tag in templates """
+    references = set()
+    for path in iter_template_files():
+        with open(path, encoding='utf-8', errors='ignore') as file:
+            references.update(STATIC_TAG_RE.findall(file.read()))
+    return references
+
+
+def get_css_references(path: str, contents: str) -> Set[str]:
+    """ Returns static file paths referenced by url() and @import of stylesheet, as ManifestStaticFilesStorage does """
+    references = set()
+    for match in CSS_URL_RE.finditer(contents):
+        url = (match.group(1) or match.group(2)).split('#')[0].split('?')[0]
+        if not url or re.match(r'^[a-z]+:', url) or url.startswith('/'):
+            continue
+        references.add(posixpath.normpath(posixpath.join(posixpath.dirname(path), url)))
+    return references
+
+
+class TemplateReferencedFinder(finders.AppDirectoriesFinder):
+    """
+    App static files finder, which lists files under STATICFILES_REFERENCED_ONLY prefixes only if templates
+    reference them, directly or from referenced stylesheets. So collectstatic doesn't hash and compress
+    unused copies of bundled libraries (non-minified, RTL, source maps). Files are found by path as usual
+    """
+
+    def get_referenced_files(self) -> Set[str]:
+        """ Returns referenced static file paths, following stylesheet references """
+        referenced = set()
+        pending = get_template_references()
+        while pending:
+            path = pending.pop()
+            referenced.add(path)
+            if not path.endswith('.css'):
+                continue
+            location = self.find(path)
+            if location:
+                with open(location, encoding='utf-8', errors='ignore') as file:
+                    pending.update(get_css_references(path, file.read()) - referenced)
+        return referenced
+
+    def list(self, ignore_patterns) -> Iterator[Tuple[str, Storage]]:
+        prefixes = tuple(settings.STATICFILES_REFERENCED_ONLY)
+        referenced = self.get_referenced_files()
+        for path, storage in super().list(ignore_patterns):
+            name = path.replace(os.sep, '/')
+            if name in referenced or not name.startswith(prefixes):
+                yield path, storage
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from exams.models import (ApplicationUser, Exam, ExamResults, Question, QuestionRecorded, QuestionVariant,
+                          QuestionVariantAnswerRecorded)
+from exams.modules.iteration import iterate_values
+
+Answers = Dict[int, List[str]]
+
+
+def get_open_attempt(exam: Exam, user: ApplicationUser) -> Optional[ExamResults]:
+    """ Returns timed attempt of exam, which user has in progress and still can submit, or None """
+    return ExamResults.objects.filter(
+        exam=exam, user=user, status=ExamResults.STATUS_IN_PROGRESS,
+        deadline__gt=timezone.now() - timedelta(seconds=settings.EXAM_DEADLINE_GRACE_SECONDS)).first()
+
+
+def start_attempt(exam: Exam, user: ApplicationUser, questions: List[list]) -> Optional[ExamResults]:
+    """
+    Start timed attempt with served questions in layout format ([question id, choice letters in shown order]).
+    Deadline is set by server, answers are autosaved to attempt until then, and attempt is scored against
+    served questions. Expired attempts of user, which sweep hasn't reached yet, are finished first.
+    Returns None if user already has attempt of exam in progress
+    """
+    now = timezone.now()
+    for expired_attempt in ExamResults.objects.filter(
+            exam=exam, user=user, status=ExamResults.STATUS_IN_PROGRESS,
+            deadline__lte=now - timedelta(seconds=settings.EXAM_DEADLINE_GRACE_SECONDS)):
+        finish_attempt(expired_attempt, {})
+    try:
+        with transaction.atomic():
+            return ExamResults.objects.create(exam=exam, user=user, status=ExamResults.STATUS_IN_PROGRESS,
+                                              started_on=now, questions=questions,
+                                              deadline=now + timedelta(minutes=exam.duration_minutes))
+    except IntegrityError:
+        return None
+
+
+def get_submission_deadline(attempt: ExamResults) -> datetime:
+    """ Returns time until which answers of attempt are accepted, deadline plus grace period for network delays """
+    return attempt.deadline + timedelta(seconds=settings.EXAM_DEADLINE_GRACE_SECONDS)
+
+
+def save_answers(attempt_id: int, user: ApplicationUser, answers: Answers) -> bool:
+    """ Autosave answers of timed attempt with one UPDATE. Returns False if attempt is finished or expired """
+    now = timezone.now()
+    return bool(ExamResults.objects.filter(
+        pk=attempt_id, user=user, status=ExamResults.STATUS_IN_PROGRESS,
+        deadline__gt=now - timedelta(seconds=settings.EXAM_DEADLINE_GRACE_SECONDS)).update(answers=answers))
+
+
+def record_answers(exam_results: ExamResults, answers: Answers, question_ids: List[int] = None) -> None:
+    """
+    Store answers of finished attempt for exam history and compute its score.
+    Attempt is scored against question_ids, if they are given, so questions left unanswered are recorded as wrong
+    and answers to other questions are ignored. Otherwise it is scored against answered questions
+    """
+    question_ids = list(answers) if question_ids is None else question_ids
+    variants: Dict[int, List[QuestionVariant]] = {}
+    for variant in QuestionVariant.objects.filter(question_id__in=question_ids).order_by('pk'):
+        variants.setdefault(variant.question_id, []).append(variant)
+    questions_with_correct_answers = 0
+    questions_recorded = 0
+    variant_records = []
+    with transaction.atomic():
+        for question_id in Question.objects.filter(id__in=question_ids).values_list('pk', flat=True):
+            question_record = QuestionRecorded.objects.create(exam_result=exam_results, question_id=question_id)
+            questions_recorded += 1
+            is_answer_correct = True
+            for answer_variant in variants.get(question_id, []):
+                was_selected = answer_variant.choice_letter in answers.get(question_id, [])
+                variant_records.append(QuestionVariantAnswerRecorded(
+                    question_variant=answer_variant, question_recorded=question_record, was_selected=was_selected))
+                if answer_variant.is_correct_answer ^ was_selected:
+                    is_answer_correct = False
+            if is_answer_correct:
+                questions_with_correct_answers += 1
+        QuestionVariantAnswerRecorded.objects.bulk_create(variant_records, batch_size=500)
+        exam_results.score = int(questions_with_correct_answers / questions_recorded * 100) \
+            if questions_recorded else 0
+        exam_results.status = ExamResults.STATUS_FINISHED
+        exam_results.save(update_fields=['score', 'status'])
+
+
+def finish_attempt(attempt: ExamResults, answers: Answers) -> bool:
+    """
+    Finish timed attempt with submitted answers, or with autosaved ones if it is submitted after deadline.
+    Attempt is claimed with conditional UPDATE, so submission and expiry sweep never record it twice.
+    Claim is rolled back if answers can't be recorded, so attempt stays in progress for the sweep to retry.
+    Returns False if attempt was already finished
+    """
+    if timezone.now() > get_submission_deadline(attempt):
+        answers = {int(question_id): letters for question_id, letters in attempt.answers.items()}
+    with transaction.atomic():
+        claimed = ExamResults.objects.filter(pk=attempt.pk, status=ExamResults.STATUS_IN_PROGRESS) \
+            .update(status=ExamResults.STATUS_FINISHED)
+        if claimed:
+            record_answers(attempt, answers, [question_id for question_id, _ in attempt.questions])
+    return bool(claimed)
+
+
+def expire_attempts(chunk_size: int = 100) -> int:
+    """
+    Submit autosaved answers of timed attempts, which deadline has passed. Expired attempts are found with
+    partial index on deadline of attempts in progress, so sweep cost doesn't depend on number of finished attempts.
+    Returns number of finished attempts
+    """
+    now = timezone.now()
+    expired = ExamResults.objects.filter(
+        status=ExamResults.STATUS_IN_PROGRESS,
+        deadline__lte=now - timedelta(seconds=settings.EXAM_DEADLINE_GRACE_SECONDS)).order_by('deadline')
+    finished = 0
+    for attempt_ids in iterate_values(expired, 'pk', chunk_size=chunk_size):
+        for attempt in ExamResults.objects.filter(pk__in=attempt_ids, status=ExamResults.STATUS_IN_PROGRESS):
+            finished += finish_attempt(attempt, {})
+    return finished
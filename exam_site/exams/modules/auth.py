@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from exams.models import ApplicationUser
+
+
+def get_user_cache_key(user_id) -> str:
+    """ Returns cache key of authenticated user """
+    return f'exams:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    Authentication backend, which keeps users loaded for requests in cache, so authenticated requests
+    with cached session don't query database at all. Cached user is removed when it is saved or deleted
+    """
+
+    def get_user(self, user_id) -> ApplicationUser:
+        key = get_user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.EXAM_USER_CACHE_TIMEOUT)
+        return user
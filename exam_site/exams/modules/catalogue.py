@@ -0,0 +1,69 @@
+import hashlib
+from typing import List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import QuerySet
+
+from exams.models import CacheVersion, Exam
+
+CATALOGUE_VERSION_KEY = 'exams:catalogue'
+
+
+class ExamCatalogue:
+    """
+    Exam list shown on index page. Pages of it are cached under catalogue version stored in database,
+    which is bumped whenever exam is created, updated or deleted, so stale pages are never read
+    """
+    LIST_FIELDS = ('id', 'title', 'source', 'is_user_uploaded', 'uploader')
+
+    def __init__(self, source: str = None, uploader: str = None):
+        self.source = source
+        self.uploader = uploader
+        self._version = None
+
+    def get_version(self) -> int:
+        """ Returns current catalogue version, read once per page """
+        if self._version is None:
+            self._version = CacheVersion.get_version(CATALOGUE_VERSION_KEY)
+        return self._version
+
+    @staticmethod
+    def bump_version() -> None:
+        """ Make all cached catalogue pages stale """
+        CacheVersion.bump_version(CATALOGUE_VERSION_KEY)
+
+    def get_queryset(self) -> QuerySet:
+        """ Returns exams matching filters with only columns shown in the list """
+        exams = Exam.objects.only(*self.LIST_FIELDS).order_by('title', 'pk')
+        if self.source:
+            exams = exams.filter(source=self.source)
+        if self.uploader:
+            exams = exams.filter(uploader=self.uploader)
+        return exams
+
+    def get_cache_key(self, *parts) -> str:
+        """ Returns key of cached data for current version and filters """
+        filters = hashlib.md5(f'{self.source}\n{self.uploader}'.encode()).hexdigest()
+        return ':'.join(['exams:catalogue', str(self.get_version()), filters] + [str(part) for part in parts])
+
+    def count(self) -> int:
+        """ Returns number of exams matching filters """
+        key = self.get_cache_key('count')
+        count = cache.get(key)
+        if count is None:
+            count = self.get_queryset().count()
+            cache.set(key, count, settings.EXAM_CATALOGUE_CACHE_TIMEOUT)
+        return count
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, item: slice) -> List[Exam]:
+        """ Returns page of exams. Paginator asks only for the slice it shows, so only that slice is cached """
+        key = self.get_cache_key(item.start, item.stop)
+        exams = cache.get(key)
+        if exams is None:
+            exams = list(self.get_queryset()[item])
+            cache.set(key, exams, settings.EXAM_CATALOGUE_CACHE_TIMEOUT)
+        return exams
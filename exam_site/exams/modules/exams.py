@@ -1,51 +1,69 @@
-import json
-from typing import IO, Dict, List, Union
+import os
+from typing import IO, Callable, List, Union
 from django.core.exceptions import ValidationError
+from django.db import transaction
 
 from exams.models import Exam, Question, QuestionVariant
-
-
-class FileParsingError(Exception):
-    pass
+from exams.modules.formats import FileParsingError, open_exam_file
 
 
 class ExamCreate:
+    PROGRESS_STEP = 100
+    VARIANTS_BATCH_SIZE = 500
+
     def __init__(self):
         self.parsing_errors = []
 
     def create_exam(self, title: str, file: IO, source: str, uploader: str = 'application',
-                    is_user_uploaded: bool = False) -> Union[None, List]:
-        """ Read file, parse question data and save"""
+                    is_user_uploaded: bool = False, on_progress: Callable[[int, int], None] = None,
+                    filename: str = '', file_format: str = None) -> Union[None, List]:
+        """
+        Read binary file of any supported format (see formats module), parse question data and save.
+        Questions are read from file one by one and saved in a transaction, which is rolled back on parsing errors,
+        so neither file contents nor whole exam are kept in memory.
+        on_progress is called with number of bytes read and file size, e.g. to update background job
+        """
         exam = Exam(title=title, source=source, is_user_uploaded=is_user_uploaded, uploader=uploader)
-        json_contents = self.get_json_from_file(file)
-        questions = []
+        file_size = self.get_file_size(file)
         question_answers_variants = []
 
-        try:
-            for question_json in json_contents:
-                question = self.parse_question_data(question_json, exam)
-                variants = self.parse_question_variants(question_json, question)
-                questions.append(question)
-                question_answers_variants.extend(variants)
-        except FileParsingError as e:
-            raise ValidationError(str(e))
-
-        if not self.parsing_errors:
+        with transaction.atomic():
             exam.save()
-            for q in questions:
-                q.save()
-            for qv in question_answers_variants:
-                qv.save()
-            return None
-        else:
-            return self.parsing_errors
+            try:
+                questions_data, reader = open_exam_file(file, filename or getattr(file, 'name', ''), file_format)
+                for processed, question_json in enumerate(questions_data, start=1):
+                    question = self.parse_question_data(question_json, exam)
+                    variants = self.parse_question_variants(question_json, question)
+                    if not self.parsing_errors:
+                        question.save()
+                        for variant in variants:
+                            variant.question = question
+                        question_answers_variants.extend(variants)
+                    if len(question_answers_variants) >= self.VARIANTS_BATCH_SIZE:
+                        QuestionVariant.objects.bulk_create(question_answers_variants)
+                        question_answers_variants = []
+                    if on_progress and processed % self.PROGRESS_STEP == 0:
+                        on_progress(reader.bytes_read, file_size)
+            except FileParsingError as e:
+                raise ValidationError(str(e))
+
+            if self.parsing_errors:
+                transaction.set_rollback(True)
+                return self.parsing_errors
+            QuestionVariant.objects.bulk_create(question_answers_variants)
+        if on_progress:
+            on_progress(reader.bytes_read, file_size)
+        return None
 
-    def get_json_from_file(self, file: IO) -> Dict:
-        """ Check file format, decode and parse as JSON """
-        raw_contents = file.read()
-        file_contents = raw_contents.decode('utf-8') if isinstance(raw_contents, bytes) else raw_contents
-        json_contents = json.loads(file_contents)
-        return json_contents
+    @staticmethod
+    def get_file_size(file: IO) -> int:
+        """ Returns size of file in bytes or 0 if it can't be determined """
+        if getattr(file, 'size', None):
+            return file.size
+        try:
+            return os.fstat(file.fileno()).st_size
+        except (AttributeError, OSError):
+            return 0
 
     def add_error(self, error: Exception) -> None:
         """ Save error in error list """
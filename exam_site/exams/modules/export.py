@@ -0,0 +1,165 @@
+import csv
+import gzip
+import io
+import json
+import os
+from typing import IO, Dict, Iterator, Type
+
+from django.utils.text import slugify
+
+from exams.models import Exam, Question, QuestionVariant
+from exams.modules.formats import CsvParser, JsonArrayParser, NdjsonParser
+from exams.modules.iteration import CHUNK_SIZE, iterate_values
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+class QuestionWriter:
+    """
+    Base class for exam file writers, counterparts of formats module parsers.
+    Writer gets question dicts in the format of JSON exam files and writes them to text stream
+    """
+    name = ''
+    extension = ''
+
+    def __init__(self, stream: IO, exam: Exam):
+        self.stream = stream
+        self.exam = exam
+
+    def write_header(self) -> None:
+        pass
+
+    def write_question(self, question: Dict, index: int) -> None:
+        raise NotImplementedError
+
+    def write_footer(self) -> None:
+        pass
+
+
+WRITERS: Dict[str, Type[QuestionWriter]] = {}
+
+
+def register_writer(writer_class: Type[QuestionWriter]) -> Type[QuestionWriter]:
+    """ Class decorator, which makes writer available for exam export """
+    WRITERS[writer_class.name] = writer_class
+    return writer_class
+
+
+@register_writer
+class JsonArrayWriter(QuestionWriter):
+    """ Writes JSON array of questions, one array item per line """
+    name = JsonArrayParser.name
+    extension = '.json'
+
+    def write_header(self) -> None:
+        self.stream.write('[')
+
+    def write_question(self, question: Dict, index: int) -> None:
+        self.stream.write(',\n' if index else '\n')
+        self.stream.write(json.dumps(question, ensure_ascii=False))
+
+    def write_footer(self) -> None:
+        self.stream.write('\n]\n')
+
+
+@register_writer
+class NdjsonWriter(QuestionWriter):
+    """ Writes one question object per line """
+    name = NdjsonParser.name
+    extension = '.ndjson'
+
+    def write_question(self, question: Dict, index: int) -> None:
+        self.stream.write(json.dumps(question, ensure_ascii=False))
+        self.stream.write('\n')
+
+
+@register_writer
+class CsvWriter(QuestionWriter):
+    """ Writes questions in layout read by CsvParser: one column per answer variant letter """
+    name = CsvParser.name
+    extension = '.csv'
+
+    def write_header(self) -> None:
+        letters = QuestionVariant.objects.filter(question__exam=self.exam).order_by('choice_letter') \
+            .values_list('choice_letter', flat=True).distinct()
+        self.variant_columns = list(letters)
+        self.writer = csv.writer(self.stream)
+        self.writer.writerow(list(CsvParser.REQUIRED_COLUMNS) + self.variant_columns)
+
+    def write_question(self, question: Dict, index: int) -> None:
+        self.writer.writerow([question['title'], question['text'], question['answer_comment'],
+                              ', '.join(question['answer'])] +
+                             [question['variants'].get(letter, '') for letter in self.variant_columns])
+
+
+class ExamExport:
+    """ Streams exam questions with answer variants to a file readable by ExamCreate """
+    def __init__(self, file_format: str = JsonArrayWriter.name, compression: str = None,
+                 chunk_size: int = CHUNK_SIZE):
+        if file_format not in WRITERS:
+            raise ValueError(f'Unknown exam file format: {file_format}')
+        if compression and compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f'Unknown compression: {compression}')
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError('zstandard package must be installed to export zstd compressed files.')
+        self.writer_class = WRITERS[file_format]
+        self.compression = compression
+        self.chunk_size = chunk_size
+
+    def get_filename(self, exam: Exam) -> str:
+        """ Returns name of export file for exam """
+        extension = self.writer_class.extension + COMPRESSION_EXTENSIONS.get(self.compression, '')
+        return f'{slugify(exam.title) or "exam"}-{exam.pk}{extension}'
+
+    def iter_questions(self, exam: Exam) -> Iterator[Dict]:
+        """
+        Yield exam questions in the format of JSON exam files.
+        Questions are fetched with iterator() in chunks, answer variants of each chunk with one more query,
+        so memory usage doesn't depend on exam size
+        """
+        questions = Question.objects.filter(exam=exam).order_by('pk')
+        for chunk in iterate_values(questions, 'pk', 'title', 'text', 'answer_explanation',
+                                    chunk_size=self.chunk_size):
+            variants = {}
+            for question_id, choice_letter, text, is_correct_answer in QuestionVariant.objects \
+                    .filter(question_id__in=[question[0] for question in chunk]).order_by('choice_letter') \
+                    .values_list('question_id', 'choice_letter', 'text', 'is_correct_answer'):
+                variants.setdefault(question_id, []).append((choice_letter, text, is_correct_answer))
+            for question_id, title, text, answer_explanation in chunk:
+                question_variants = variants.get(question_id, [])
+                yield {'title': title, 'text': text, 'answer_comment': answer_explanation,
+                       'answer': [letter for letter, _, is_correct_answer in question_variants if is_correct_answer],
+                       'variants': {letter: variant_text for letter, variant_text, _ in question_variants}}
+
+    def write(self, exam: Exam, stream: IO) -> int:
+        """ Write exam to binary stream, which is left open. Returns number of exported questions """
+        if self.compression == 'gzip':
+            compressed_stream = gzip.GzipFile(fileobj=stream, mode='wb')
+        elif self.compression == 'zstd':
+            compressed_stream = zstandard.ZstdCompressor().stream_writer(stream, closefd=False)
+        else:
+            compressed_stream = stream
+        text_stream = io.TextIOWrapper(compressed_stream, encoding='utf-8', newline='')
+        writer = self.writer_class(text_stream, exam)
+        writer.write_header()
+        exported = 0
+        for exported, question in enumerate(self.iter_questions(exam), start=1):
+            writer.write_question(question, exported - 1)
+        writer.write_footer()
+        text_stream.flush()
+        text_stream.detach()
+        if compressed_stream is not stream:
+            compressed_stream.close()
+        return exported
+
+    def export_to_directory(self, exam: Exam, directory: str) -> str:
+        """ Write exam to file in directory and return its path """
+        path = os.path.join(directory, self.get_filename(exam))
+        with open(path, 'wb') as file:
+            self.write(exam, file)
+        return path
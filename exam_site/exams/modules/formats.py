@@ -0,0 +1,212 @@
+import csv
+import gzip
+import io
+import json
+import os
+import re
+from typing import IO, Dict, Iterator, Optional, TextIO, Tuple, Type
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+READ_CHUNK_SIZE = 64 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+COMPRESSION_EXTENSIONS = ('.gz', '.zst')
+
+
+class FileParsingError(Exception):
+    pass
+
+
+class QuestionParser:
+    """
+    Base class for exam file parsers.
+    Parser reads decoded text stream and yields question dicts in the format of JSON exam files:
+    {"title": ..., "text": ..., "answer_comment": ..., "answer": [...], "variants": {"A": ..., ...}}
+    """
+    name = ''
+    extensions = ()
+
+    def parse(self, stream: TextIO) -> Iterator[dict]:
+        raise NotImplementedError
+
+
+PARSERS: Dict[str, QuestionParser] = {}
+
+
+def register_parser(parser_class: Type[QuestionParser]) -> Type[QuestionParser]:
+    """ Class decorator, which makes parser available for uploads and upload_exam command """
+    PARSERS[parser_class.name] = parser_class()
+    return parser_class
+
+
+@register_parser
+class JsonArrayParser(QuestionParser):
+    """ Parser for JSON array of questions. Array items are decoded one by one, not the whole file at once """
+    name = 'json'
+    extensions = ('.json',)
+
+    def parse(self, stream: TextIO) -> Iterator[dict]:
+        decoder = json.JSONDecoder()
+        chunks = iter(lambda: stream.read(READ_CHUNK_SIZE), '')
+        buffer = ''
+        is_array_opened = False
+        expects_item = True
+        while True:
+            buffer = buffer.lstrip()
+            if not buffer:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    raise FileParsingError('Unexpected end of file with questions.')
+                buffer = chunk
+            elif not is_array_opened:
+                if buffer[0] != '[':
+                    raise FileParsingError('File with questions must contain JSON array.')
+                is_array_opened = True
+                buffer = buffer[1:]
+            elif buffer[0] == ']':
+                return
+            elif not expects_item:
+                if buffer[0] != ',':
+                    raise FileParsingError('Questions in file must be separated with commas.')
+                expects_item = True
+                buffer = buffer[1:]
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError as e:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        raise FileParsingError(f'File with questions is not valid JSON: {e}')
+                    buffer += chunk
+                    continue
+                yield item
+                expects_item = False
+                buffer = buffer[end:]
+
+
+@register_parser
+class NdjsonParser(QuestionParser):
+    """ Parser for newline-delimited JSON: one question object per line """
+    name = 'ndjson'
+    extensions = ('.ndjson', '.jsonl')
+
+    def parse(self, stream: TextIO) -> Iterator[dict]:
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise FileParsingError(f'Line {line_number} is not valid JSON: {e}')
+
+
+@register_parser
+class CsvParser(QuestionParser):
+    """
+    Parser for spreadsheet exported questions.
+    Header must contain title, text, answer_comment and answer columns, other columns are answer variants
+    named by choice letter. Answer column lists letters of correct variants, e.g. "A" or "A, C"
+    """
+    name = 'csv'
+    extensions = ('.csv',)
+    REQUIRED_COLUMNS = ('title', 'text', 'answer_comment', 'answer')
+
+    def parse(self, stream: TextIO) -> Iterator[dict]:
+        reader = csv.DictReader(stream)
+        missing_columns = [column for column in self.REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing_columns:
+            raise FileParsingError(f'CSV file doesn\'t have columns: {", ".join(missing_columns)}')
+        variant_columns = [column for column in reader.fieldnames if column not in self.REQUIRED_COLUMNS]
+        for row in reader:
+            yield {'title': row['title'], 'text': row['text'], 'answer_comment': row['answer_comment'],
+                   'answer': re.findall(r'\w', row['answer'] or ''),
+                   'variants': {column: row[column] for column in variant_columns if row[column]}}
+
+
+class CountingReader(io.RawIOBase):
+    """
+    Binary stream wrapper, which counts bytes read from wrapped file to report import progress.
+    Text files are encoded to UTF-8: characters may take several bytes, so bytes not fitting into buffer
+    are kept for the next read
+    """
+
+    def __init__(self, file: IO):
+        self.file = file
+        self.bytes_read = 0
+        self.pending = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self.pending:
+            data = self.file.read(len(buffer))
+            self.pending = data.encode('utf-8') if isinstance(data, str) else data
+        data, self.pending = self.pending[:len(buffer)], self.pending[len(buffer):]
+        buffer[:len(data)] = data
+        self.bytes_read += len(data)
+        return len(data)
+
+
+def strip_compression_extension(filename: str) -> str:
+    """ Returns file name without .gz or .zst extension """
+    root, extension = os.path.splitext(filename)
+    return root if extension.lower() in COMPRESSION_EXTENSIONS else filename
+
+
+def get_parser_for_filename(filename: str) -> Optional[QuestionParser]:
+    """ Returns parser for file extension, ignoring compression extension """
+    extension = os.path.splitext(strip_compression_extension(filename))[1].lower()
+    for parser in PARSERS.values():
+        if extension in parser.extensions:
+            return parser
+    return None
+
+
+def supported_extensions() -> str:
+    """ Returns list of supported file extensions for error messages """
+    return ', '.join(extension for parser in PARSERS.values() for extension in parser.extensions)
+
+
+def decompress(stream: io.BufferedReader) -> io.BufferedIOBase:
+    """ Detect gzip or zstd compression by magic bytes and return decompressed stream """
+    head = stream.peek(len(ZSTD_MAGIC))
+    if head.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=stream)
+    if head.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise FileParsingError('zstandard package must be installed to import zstd compressed files.')
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(stream), READ_CHUNK_SIZE)
+    return stream
+
+
+def sniff_parser(stream: io.BufferedIOBase) -> QuestionParser:
+    """ Guess file format by its first significant character """
+    head = stream.peek(READ_CHUNK_SIZE).lstrip(b'\xef\xbb\xbf').lstrip()
+    if head.startswith(b'['):
+        return PARSERS[JsonArrayParser.name]
+    if head.startswith(b'{'):
+        return PARSERS[NdjsonParser.name]
+    return PARSERS[CsvParser.name]
+
+
+def open_exam_file(file: IO, filename: str = '', file_format: str = None) -> Tuple[Iterator[dict], CountingReader]:
+    """
+    Open binary exam file of any registered format, decompressing it on the fly.
+    Format is taken from file_format argument, file extension or guessed from file contents.
+    Returns iterator over questions and reader counting consumed bytes of the original file.
+    """
+    counting_reader = CountingReader(file)
+    stream = decompress(io.BufferedReader(counting_reader, READ_CHUNK_SIZE))
+    if file_format:
+        if file_format not in PARSERS:
+            raise FileParsingError(f'Unknown exam file format: {file_format}')
+        parser = PARSERS[file_format]
+    else:
+        parser = get_parser_for_filename(filename) or sniff_parser(stream)
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return parser.parse(text_stream), counting_reader
@@ -0,0 +1,29 @@
+import itertools
+from typing import Iterable, Iterator, List
+
+from django.db.models import QuerySet
+
+CHUNK_SIZE = 500
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """ Split iterable into lists of given size """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iterate_chunks(queryset: QuerySet, chunk_size: int = CHUNK_SIZE) -> Iterator[List]:
+    """
+    Yield rows of queryset in lists of chunk_size. Rows are streamed with iterator(), which skips queryset cache,
+    so only one chunk is kept in memory however large queryset is
+    """
+    return batched(queryset.iterator(chunk_size=chunk_size), chunk_size)
+
+
+def iterate_values(queryset: QuerySet, *fields: str, chunk_size: int = CHUNK_SIZE) -> Iterator[List]:
+    """ Same as iterate_chunks for tuples of given fields, so model instances are not created at all """
+    return iterate_chunks(queryset.values_list(*fields, flat=len(fields) == 1), chunk_size)
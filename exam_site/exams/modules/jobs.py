@@ -0,0 +1,131 @@
+import os
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from exams.models import ApplicationUser, Exam, Job
+from exams.modules.exams import ExamCreate
+from exams.modules.layouts import ExamLayoutPool
+from exams.modules.regrading import Regrading
+
+JOB_HANDLERS: Dict[str, Callable[[Job], None]] = {}
+
+
+def job_handler(kind: str) -> Callable:
+    """ Register function as a handler for jobs of given kind """
+    def decorator(handler: Callable[[Job], None]) -> Callable[[Job], None]:
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+class JobQueue:
+    """ Database backed job queue. Jobs are added by web process and executed by run_jobs command """
+
+    def enqueue(self, kind: str, payload: Dict = None, user: ApplicationUser = None) -> Job:
+        """ Add new job to the queue """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f'Unknown job kind: {kind}')
+        return Job.objects.create(kind=kind, payload=payload or {}, created_by=user)
+
+    def claim_next(self) -> Optional[Job]:
+        """
+        Take the oldest queued job and mark it as running.
+        Claiming is done with conditional UPDATE, so several workers never get the same job.
+        """
+        while True:
+            job_id = Job.objects.filter(status=Job.STATUS_QUEUED).order_by('created_on', 'pk') \
+                .values_list('pk', flat=True).first()
+            if job_id is None:
+                return None
+            now = timezone.now()
+            claimed = Job.objects.filter(pk=job_id, status=Job.STATUS_QUEUED) \
+                .update(status=Job.STATUS_RUNNING, started_on=now, heartbeat_on=now)
+            if claimed:
+                return Job.objects.get(pk=job_id)
+
+    def run(self, job: Job) -> Job:
+        """
+        Execute claimed job and save its outcome. Outcome is saved only if job is still running:
+        job, which was failed as stale meanwhile, is returned as it is stored
+        """
+        try:
+            JOB_HANDLERS[job.kind](job)
+        except Exception as e:
+            job.status = Job.STATUS_FAILED
+            job.error = '\n'.join(e.messages) if isinstance(e, ValidationError) else str(e)
+        else:
+            job.status = Job.STATUS_DONE
+        job.finished_on = timezone.now()
+        if not Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING) \
+                .update(status=job.status, error=job.error, finished_on=job.finished_on):
+            job.refresh_from_db()
+        return job
+
+    def fail_stale(self, timeout: float = None) -> int:
+        """
+        Fail running jobs without progress for timeout seconds: worker running them was killed or restarted.
+        Files of failed upload jobs are removed. Returns number of failed jobs
+        """
+        timeout = settings.EXAM_JOB_STALE_TIMEOUT if timeout is None else timeout
+        stale = Job.objects.filter(status=Job.STATUS_RUNNING,
+                                   heartbeat_on__lt=timezone.now() - timedelta(seconds=timeout))
+        failed = 0
+        for job in stale:
+            # Conditional UPDATE, so job, which reported progress meanwhile, is not failed
+            if stale.filter(pk=job.pk).update(status=Job.STATUS_FAILED, finished_on=timezone.now(),
+                                              error='Worker stopped while job was running'):
+                failed += 1
+                if job.kind == Job.KIND_UPLOAD:
+                    remove_upload_file(job.payload)
+        return failed
+
+    def run_next(self) -> Optional[Job]:
+        """ Claim and execute one job. Returns None if queue is empty """
+        close_old_connections()
+        job = self.claim_next()
+        if job is None:
+            return None
+        return self.run(job)
+
+
+def remove_upload_file(payload: Dict) -> None:
+    """ Remove uploaded file of upload job """
+    if os.path.exists(payload['path']):
+        os.remove(payload['path'])
+
+
+@job_handler(Job.KIND_UPLOAD)
+def upload_exam(job: Job) -> None:
+    """ Parse uploaded file and create exam from it. Errors are saved in job """
+    payload = job.payload
+    try:
+        with open(payload['path'], 'rb') as file:
+            errors = ExamCreate().create_exam(payload['title'], file, payload.get('source', ''),
+                                              uploader=payload.get('uploader', 'application'),
+                                              is_user_uploaded=True, on_progress=job.set_progress,
+                                              filename=payload.get('filename', ''))
+    finally:
+        remove_upload_file(payload)
+    if errors:
+        raise ValidationError(errors)
+
+
+@job_handler(Job.KIND_GENERATE_LAYOUTS)
+def generate_layouts(job: Job) -> None:
+    """ Regenerate pools of pre-generated layouts of exams """
+    exams = Exam.objects.filter(pk__in=job.payload['exam_ids']).order_by('pk')
+    job.set_progress(0, len(exams))
+    for generated, exam in enumerate(exams, start=1):
+        ExamLayoutPool(exam).generate(job.payload.get('pool_size'))
+        job.set_progress(generated)
+
+
+@job_handler(Job.KIND_REGRADE)
+def regrade(job: Job) -> None:
+    """ Recompute scores of attempts including questions, which correct answers were changed """
+    Regrading(on_progress=job.set_progress).regrade(job.payload.get('question_ids'), job.payload.get('exam_id'))
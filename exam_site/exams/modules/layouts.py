@@ -0,0 +1,60 @@
+import random
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from exams.models import Exam, ExamLayout, Question, QuestionVariant
+
+POOL_QUESTION_QUANTITIES = (5, 10, 20, 30, 50)
+
+
+class ExamLayoutPool:
+    """
+    Pool of pre-generated exam layouts. Layouts are generated ahead of time by background job,
+    so at exam start user gets random one with a single indexed query instead of sampling questions
+    """
+
+    def __init__(self, exam: Exam):
+        self.exam = exam
+
+    def get_question_quantities(self) -> List[int]:
+        """ Returns question numbers offered on exam setup page, which layouts are generated for """
+        question_number = self.exam.question_number
+        return sorted({quantity for quantity in POOL_QUESTION_QUANTITIES if quantity < question_number} |
+                      {question_number} - {0})
+
+    def generate(self, pool_size: int = None, quantities: Iterable[int] = None, rng: random.Random = None) -> int:
+        """ Replace exam layouts with pool_size new layouts for each question quantity. Returns number of layouts """
+        pool_size = pool_size or settings.EXAM_LAYOUT_POOL_SIZE
+        quantities = list(quantities or self.get_question_quantities())
+        rng = rng or random.Random()
+        variant_letters: Dict[int, List[str]] = {}
+        for question_id, choice_letter in QuestionVariant.objects.filter(question__exam=self.exam) \
+                .order_by('question_id', 'choice_letter').values_list('question_id', 'choice_letter'):
+            variant_letters.setdefault(question_id, []).append(choice_letter)
+        question_ids = list(Question.objects.filter(exam=self.exam).values_list('pk', flat=True))
+
+        layouts = []
+        for quantity in quantities:
+            for slot in range(pool_size):
+                layout = []
+                for question_id in rng.sample(question_ids, min(quantity, len(question_ids))):
+                    letters = list(variant_letters.get(question_id, []))
+                    rng.shuffle(letters)
+                    layout.append([question_id, ''.join(letters)])
+                layouts.append(ExamLayout(exam=self.exam, question_quantity=quantity, slot=slot, layout=layout))
+
+        with transaction.atomic():
+            ExamLayout.objects.filter(exam=self.exam).delete()
+            ExamLayout.objects.bulk_create(layouts, batch_size=500)
+            Exam.objects.filter(pk=self.exam.pk).update(layout_pool_size=pool_size)
+        self.exam.layout_pool_size = pool_size
+        return len(layouts)
+
+    def pick(self, question_quantity: int) -> Optional[ExamLayout]:
+        """ Returns random layout with given number of questions, or None if there is no such layout """
+        if not self.exam.layout_pool_size:
+            return None
+        slot = random.randrange(self.exam.layout_pool_size)
+        return ExamLayout.objects.filter(exam=self.exam, question_quantity=question_quantity, slot=slot).first()
@@ -0,0 +1,39 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator, which takes row count of unfiltered big tables from database statistics instead of COUNT(*).
+    Used for admin changelists of tables with millions of rows, where exact count would scan the whole table
+    """
+    ESTIMATE_THRESHOLD = 100000
+
+    @cached_property
+    def count(self) -> int:
+        """ Return estimated number of rows if it is big enough, exact count otherwise """
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and not query.is_sliced:
+            estimate = self.get_estimated_count(self.object_list.db, self.object_list.model._meta.db_table)
+            if estimate >= self.ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def get_estimated_count(database: str, table: str) -> int:
+        """ Returns row count from PostgreSQL planner statistics or SQLite ANALYZE results, 0 if there are none """
+        connection = connections[database]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [table])
+                row = cursor.fetchone()
+                return int(row[0]) if row else 0
+            if connection.vendor == 'sqlite':
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+                if cursor.fetchone() is None:
+                    return 0
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+                row = cursor.fetchone()
+                return int(row[0].split()[0]) if row else 0
+        return 0
@@ -0,0 +1,70 @@
+import functools
+import math
+import time
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse, JsonResponse
+
+
+def get_client_key(request: WSGIRequest) -> str:
+    """ Returns key of request client: user for authenticated requests, IP address for anonymous ones """
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    ip = request.META.get('REMOTE_ADDR', '')
+    if settings.EXAM_RATE_LIMIT_TRUST_FORWARDED_FOR:
+        ip = request.META.get('HTTP_X_FORWARDED_FOR', ip).split(',')[0].strip()
+    return f'ip:{ip}'
+
+
+class TokenBucket:
+    """
+    Token bucket stored in cache. Bucket holds up to `requests` tokens and is refilled at `requests` per `period`
+    seconds, so client may send short bursts while average rate is bounded.
+    Bucket is read and written without locking: concurrent requests may occasionally both take the last token
+    """
+
+    def __init__(self, scope: str, client_key: str, requests: int, period: float):
+        self.key = f'exams:ratelimit:{scope}:{client_key}'
+        self.capacity = requests
+        self.rate = requests / period
+        self.period = period
+
+    def consume(self, now: float = None) -> Optional[float]:
+        """ Take one token. Returns None if token was taken, or seconds to wait for the next token otherwise """
+        now = time.time() if now is None else now
+        tokens, updated_on = cache.get(self.key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_on) * self.rate)
+        if tokens < 1:
+            return (1 - tokens) / self.rate
+        cache.set(self.key, (tokens - 1, now), math.ceil(self.period))
+        return None
+
+
+def get_limit(scope: str) -> Optional[Tuple[int, float]]:
+    """ Returns (requests, period in seconds) budget of scope, None if scope is not limited """
+    return settings.EXAM_RATE_LIMITS.get(scope)
+
+
+def rate_limit(scope: str, methods: Tuple[str, ...] = ('POST',), json: bool = False) -> Callable:
+    """
+    View decorator limiting requests of each client to budget of scope in EXAM_RATE_LIMITS setting.
+    Requests over budget get 429 response with Retry-After header and don't reach the view
+    """
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(request: WSGIRequest, *args, **kwargs) -> HttpResponse:
+            limit = get_limit(scope)
+            if limit and request.method in methods:
+                retry_after = TokenBucket(scope, get_client_key(request), *limit).consume()
+                if retry_after is not None:
+                    message = 'Too many requests, please try again later.'
+                    response = JsonResponse({'error': message}, status=429) if json else \
+                        HttpResponse(message, status=429)
+                    response['Retry-After'] = str(math.ceil(retry_after))
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,79 @@
+from typing import Callable, Dict, Iterable, List, Set
+
+from django.db.models import Exists, OuterRef, QuerySet
+
+from exams.models import ExamResults, QuestionRecorded, QuestionVariant, QuestionVariantAnswerRecorded
+from exams.modules.iteration import CHUNK_SIZE, iterate_values
+from exams.modules.results import ExamResultPage
+
+
+class Regrading:
+    """
+    Recomputes scores of finished attempts after correct answers of questions were changed.
+    Attempts are processed in batches: each batch is graded with three queries and saved with one bulk update
+    """
+    BATCH_SIZE = CHUNK_SIZE
+
+    def __init__(self, batch_size: int = BATCH_SIZE, on_progress: Callable[[int, int], None] = None):
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+
+    @staticmethod
+    def get_affected_attempts(question_ids: Iterable[int] = None, exam_id: int = None) -> QuerySet:
+        """ Returns attempts, which include any of questions, or all attempts of exam, or all attempts """
+        attempts = ExamResults.objects.order_by('pk')
+        if question_ids is not None:
+            attempts = attempts.filter(Exists(QuestionRecorded.objects.filter(
+                exam_result=OuterRef('pk'), question_id__in=list(question_ids))))
+        if exam_id is not None:
+            attempts = attempts.filter(exam_id=exam_id)
+        return attempts
+
+    @staticmethod
+    def compute_scores(attempt_ids: List[int]) -> Dict[int, int]:
+        """
+        Returns scores of attempts graded by current correct answers. Question is answered correctly
+        when selected variants are exactly its correct variants. Attempts without questions are not returned
+        """
+        question_records = list(QuestionRecorded.objects.filter(exam_result_id__in=attempt_ids)
+                                .values_list('pk', 'exam_result_id', 'question_id'))
+        selected: Dict[int, Set[int]] = {}
+        for question_recorded_id, question_variant_id in QuestionVariantAnswerRecorded.objects \
+                .filter(question_recorded__exam_result_id__in=attempt_ids, was_selected=True) \
+                .values_list('question_recorded_id', 'question_variant_id'):
+            selected.setdefault(question_recorded_id, set()).add(question_variant_id)
+        correct: Dict[int, Set[int]] = {}
+        for question_id, variant_id in QuestionVariant.objects \
+                .filter(question_id__in={question_id for _, _, question_id in question_records},
+                        is_correct_answer=True).values_list('question_id', 'pk'):
+            correct.setdefault(question_id, set()).add(variant_id)
+
+        totals: Dict[int, int] = {}
+        correct_answers: Dict[int, int] = {}
+        for question_recorded_id, attempt_id, question_id in question_records:
+            totals[attempt_id] = totals.get(attempt_id, 0) + 1
+            is_answer_correct = selected.get(question_recorded_id, set()) == correct.get(question_id, set())
+            correct_answers[attempt_id] = correct_answers.get(attempt_id, 0) + is_answer_correct
+        return {attempt_id: int(correct_answers[attempt_id] / total * 100) for attempt_id, total in totals.items()}
+
+    def regrade(self, question_ids: Iterable[int] = None, exam_id: int = None) -> int:
+        """ Recompute scores of affected attempts and save changed ones. Returns number of changed attempts """
+        attempts = self.get_affected_attempts(question_ids, exam_id)
+        total = attempts.count() if self.on_progress else 0
+        processed = changed = 0
+        exam_ids = set()
+        for batch in iterate_values(attempts, 'pk', 'exam_id', 'score', chunk_size=self.batch_size):
+            scores = self.compute_scores([attempt_id for attempt_id, _, _ in batch])
+            changed_attempts = []
+            for attempt_id, attempt_exam_id, score in batch:
+                if attempt_id in scores and scores[attempt_id] != score:
+                    changed_attempts.append(ExamResults(pk=attempt_id, score=scores[attempt_id]))
+                    exam_ids.add(attempt_exam_id)
+            ExamResults.objects.bulk_update(changed_attempts, ['score'])
+            changed += len(changed_attempts)
+            processed += len(batch)
+            if self.on_progress:
+                self.on_progress(processed, total)
+        for changed_exam_id in exam_ids:
+            ExamResultPage.bump_version(changed_exam_id)
+        return changed
@@ -0,0 +1,65 @@
+from typing import Iterable
+
+from django.db.models import Count, Exists, Max, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+
+from exams.models import QuestionReport
+
+
+class ReportTriage:
+    """ Queries and bulk operations for admin's question report queue """
+
+    @staticmethod
+    def filter_reports(status: str = None, exam_id: int = None) -> QuerySet:
+        """ Returns reports, which are not folded into another report, with optional status and exam filters """
+        reports = QuestionReport.objects.filter(duplicate_of__isnull=True)
+        if status:
+            reports = reports.filter(status=status)
+        if exam_id:
+            reports = reports.filter(question__exam_id=exam_id)
+        return reports
+
+    def queue(self, status: str = None, exam_id: int = None) -> QuerySet:
+        """ Returns reports, new first, with question and exam selected in the same query """
+        return self.filter_reports(status, exam_id) \
+            .select_related('question__exam').defer('question__text', 'question__answer_explanation') \
+            .annotate(duplicate_count=Coalesce(Subquery(
+                QuestionReport.objects.filter(duplicate_of=OuterRef('pk')).values('duplicate_of')
+                .annotate(count=Count('pk')).values('count')), 0)) \
+            .order_by('priority', '-reported_on')
+
+    def questions(self, status: str = None, exam_id: int = None) -> QuerySet:
+        """ Returns reported questions with number of reports on each, questions with most new reports first """
+        return self.filter_reports(status, exam_id) \
+            .values('question_id', 'question__title', 'question__exam__title') \
+            .annotate(report_count=Count('pk', distinct=True) + Count('duplicates', distinct=True),
+                      new_count=Count('pk', filter=Q(status=QuestionReport.STATUS_NEW), distinct=True) +
+                      Count('duplicates', filter=Q(duplicates__status=QuestionReport.STATUS_NEW), distinct=True),
+                      last_reported_on=Max('reported_on')) \
+            .order_by('-new_count', '-report_count', 'question_id')
+
+    @staticmethod
+    def resolve(report_ids: Iterable[int], status: str, resolution: str = '') -> int:
+        """ Accept or reject reports and reports folded into them with one UPDATE. Returns number of reports """
+        report_ids = list(report_ids)
+        return QuestionReport.objects.filter(Q(pk__in=report_ids) | Q(duplicate_of_id__in=report_ids)) \
+            .update(status=status, resolution=resolution, priority=QuestionReport.priority_for_status(status))
+
+    @staticmethod
+    def resolve_questions(question_ids: Iterable[int], status: str, resolution: str = '') -> int:
+        """ Accept or reject all new reports on questions with one UPDATE. Returns number of reports """
+        return QuestionReport.objects.filter(question_id__in=list(question_ids), status=QuestionReport.STATUS_NEW) \
+            .update(status=status, resolution=resolution, priority=QuestionReport.priority_for_status(status))
+
+    @staticmethod
+    def fold_duplicates(question_ids: Iterable[int] = None) -> int:
+        """
+        Fold new reports on the same question into the earliest of them, so question is shown in queue once.
+        Folded reports are resolved together with the report they are folded into. Returns number of folded reports
+        """
+        unfolded = QuestionReport.objects.filter(status=QuestionReport.STATUS_NEW, duplicate_of__isnull=True)
+        if question_ids is not None:
+            unfolded = unfolded.filter(question_id__in=list(question_ids))
+        earlier_reports = unfolded.filter(question=OuterRef('question'), pk__lt=OuterRef('pk'))
+        return unfolded.filter(Exists(earlier_reports)).update(
+            duplicate_of=Subquery(earlier_reports.order_by('pk').values('pk')[:1]))
@@ -0,0 +1,77 @@
+import hashlib
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.template.loader import render_to_string
+
+from exams.models import Exam, ExamResults, QuestionRecorded, QuestionVariant, QuestionVariantAnswerRecorded
+
+
+class ExamResultPage:
+    """
+    Rendered list of questions of finished exam attempt. Attempt never changes, so it is rendered once and cached
+    under version of exam answers, which is stored on exam and bumped when answer variants of exam questions
+    are changed. Version is read with attempt, so stale page is never served, even if exam was changed by worker
+    """
+    template_name = 'exams/exam_results_questions.html'
+
+    def __init__(self, exam_record: ExamResults):
+        self.exam_record = exam_record
+
+    def get_version(self) -> int:
+        """ Returns current version of exam answers """
+        return self.exam_record.exam.results_version
+
+    @staticmethod
+    def bump_version(exam_id: int) -> None:
+        """ Make cached result pages of all attempts of exam stale """
+        Exam.objects.filter(pk=exam_id).update(results_version=F('results_version') + 1)
+
+    def get_etag(self, *parts) -> str:
+        """ Returns ETag of result page for current answers version, parts are other things page depends on """
+        return hashlib.md5('\n'.join([self.exam_record.unique_id, str(self.get_version())] +
+                                     [str(part) for part in parts]).encode()).hexdigest()
+
+    def get_cache_key(self) -> str:
+        """ Returns key of rendered questions of attempt """
+        return ':'.join(['exams:results', str(self.get_version()),
+                         str(self.exam_record.exam_id), hashlib.md5(self.exam_record.unique_id.encode()).hexdigest()])
+
+    def get_questions(self) -> List:
+        """ Returns attempt questions with answer variants marked as selected, with three queries in total """
+        question_records = list(QuestionRecorded.objects.filter(exam_result=self.exam_record)
+                                .select_related('question').order_by('pk'))
+        selected: Dict[Tuple[int, int], bool] = {
+            (question_recorded_id, question_variant_id): was_selected
+            for question_recorded_id, question_variant_id, was_selected in QuestionVariantAnswerRecorded.objects
+            .filter(question_recorded__exam_result=self.exam_record)
+            .values_list('question_recorded_id', 'question_variant_id', 'was_selected')}
+        variants: Dict[int, List[QuestionVariant]] = {}
+        for variant in QuestionVariant.objects.filter(
+                question_id__in=[question_record.question_id for question_record in question_records]).order_by('pk'):
+            variants.setdefault(variant.question_id, []).append(variant)
+
+        questions = []
+        for question_record in question_records:
+            question = question_record.question
+            question.answer_variants = []
+            for variant in variants.get(question.pk, []):
+                variant.was_selected = selected.get((question_record.pk, variant.pk), False)
+                question.answer_variants.append(variant)
+            question.is_answer_correct = all(variant.was_selected == variant.is_correct_answer
+                                             for variant in question.answer_variants)
+            question.has_one_correct_answer = sum(variant.is_correct_answer
+                                                  for variant in question.answer_variants) == 1
+            questions.append(question)
+        return questions
+
+    def render(self) -> str:
+        """ Returns rendered questions of attempt from cache, rendering them if they are not cached yet """
+        key = self.get_cache_key()
+        html = cache.get(key)
+        if html is None:
+            html = render_to_string(self.template_name, {'questions': self.get_questions()})
+            cache.set(key, html, settings.EXAM_RESULTS_CACHE_TIMEOUT)
+        return html
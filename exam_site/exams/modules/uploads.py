@@ -0,0 +1,128 @@
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+from typing import IO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.utils import timezone
+
+from exams.models import ApplicationUser, ChunkedUpload, Job
+from exams.modules.jobs import JobQueue
+
+BLOCK_SIZE = 64 * 1024
+
+
+class ChunkedUploadError(Exception):
+    pass
+
+
+def store_upload(file: UploadedFile) -> str:
+    """ Write uploaded file to upload directory chunk by chunk and return path to it """
+    os.makedirs(settings.EXAM_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.EXAM_UPLOAD_DIR, f'{uuid.uuid4().hex}.upload')
+    with open(path, 'wb') as destination:
+        for chunk in file.chunks():
+            destination.write(chunk)
+    return path
+
+
+def file_checksum(path: str) -> str:
+    """ Returns SHA-256 of file, reading it block by block """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def start_chunked_upload(owner: ApplicationUser, exam_title: str, exam_source: str, filename: str, size: int,
+                         checksum: str = '') -> ChunkedUpload:
+    """ Register new chunked upload and create empty file for its parts """
+    upload = ChunkedUpload.objects.create(upload_id=uuid.uuid4().hex, owner=owner, exam_title=exam_title,
+                                          exam_source=exam_source, filename=filename, size=size,
+                                          checksum=checksum.lower())
+    os.makedirs(settings.EXAM_UPLOAD_DIR, exist_ok=True)
+    open(upload.path, 'wb').close()
+    return upload
+
+
+def write_chunk(upload: ChunkedUpload, offset: int, stream: IO, length: int, checksum: str = '') -> None:
+    """
+    Copy chunk of given length from stream (e.g. request body) straight to upload file.
+    Chunk must start where previous one ended, so after failure client asks for current offset and resumes from it.
+    Incomplete chunk or chunk with wrong SHA-256 checksum is discarded.
+    """
+    if upload.is_complete:
+        raise ChunkedUploadError('Upload is already complete.')
+    if offset != upload.offset:
+        raise ChunkedUploadError(f'Upload must be resumed from offset {upload.offset}.')
+    if length <= 0 or offset + length > upload.size:
+        raise ChunkedUploadError('Chunk is empty or exceeds declared file size.')
+
+    digest = hashlib.sha256()
+    written = 0
+    with open(upload.path, 'r+b') as destination:
+        destination.seek(offset)
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            destination.write(block)
+            digest.update(block)
+            written += len(block)
+        if written != length or (checksum and checksum.lower() != digest.hexdigest()):
+            destination.truncate(offset)
+            raise ChunkedUploadError('Chunk is incomplete or its checksum does not match, upload it again.')
+        destination.truncate()
+
+    if not ChunkedUpload.objects.filter(pk=upload.pk, offset=offset, completed_on__isnull=True) \
+            .update(offset=offset + length, updated_on=timezone.now()):
+        raise ChunkedUploadError('Chunk with the same offset was uploaded concurrently.')
+    upload.offset = offset + length
+
+
+def complete_chunked_upload(upload: ChunkedUpload) -> Job:
+    """ Verify assembled file and queue its import """
+    if upload.is_complete:
+        if upload.job is None:
+            raise ChunkedUploadError('Upload is already complete.')
+        return upload.job
+    if upload.offset != upload.size:
+        raise ChunkedUploadError(f'Only {upload.offset} of {upload.size} bytes were uploaded.')
+    if upload.checksum and file_checksum(upload.path) != upload.checksum:
+        open(upload.path, 'wb').close()
+        ChunkedUpload.objects.filter(pk=upload.pk).update(offset=0)
+        upload.offset = 0
+        raise ChunkedUploadError('File checksum does not match, upload it again.')
+
+    # Completion is claimed with conditional UPDATE, so concurrent requests don't queue the file twice
+    upload.completed_on = timezone.now()
+    if not ChunkedUpload.objects.filter(pk=upload.pk, completed_on__isnull=True) \
+            .update(completed_on=upload.completed_on):
+        raise ChunkedUploadError('Upload is already complete.')
+    path = os.path.join(settings.EXAM_UPLOAD_DIR, f'{upload.upload_id}.upload')
+    os.replace(upload.path, path)
+    payload = {'path': path, 'filename': upload.filename, 'title': upload.exam_title,
+               'source': upload.exam_source, 'uploader': str(upload.owner)}
+    upload.job = JobQueue().enqueue(Job.KIND_UPLOAD, payload, user=upload.owner)
+    upload.save(update_fields=['job'])
+    return upload.job
+
+
+def remove_expired_uploads(expiry: float = None) -> int:
+    """
+    Remove uploads without new parts for expiry seconds with their part files. Complete uploads are removed too:
+    their files were passed to import jobs, rows are kept only for client to repeat completion request.
+    Returns number of removed uploads
+    """
+    expiry = settings.EXAM_CHUNKED_UPLOAD_EXPIRY if expiry is None else expiry
+    expired = ChunkedUpload.objects.filter(updated_on__lt=timezone.now() - timedelta(seconds=expiry))
+    removed = 0
+    for upload in expired:
+        if expired.filter(pk=upload.pk).delete()[0]:
+            removed += 1
+            if not upload.is_complete and os.path.exists(upload.path):
+                os.remove(upload.path)
+    return removed
@@ -0,0 +1,70 @@
+import threading
+
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import ApplicationUser, Exam, Question, QuestionVariant
+from .modules.auth import get_user_cache_key
+from .modules.catalogue import ExamCatalogue
+from .modules.results import ExamResultPage
+
+
+@receiver([post_save, post_delete], sender=ApplicationUser)
+def forget_cached_user(sender, instance: ApplicationUser, **kwargs) -> None:
+    """ Remove changed user from authentication cache """
+    cache.delete(get_user_cache_key(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Exam)
+def bump_catalogue_version(sender, instance: Exam, **kwargs) -> None:
+    """ Make cached exam list pages stale """
+    ExamCatalogue.bump_version()
+
+
+@receiver(post_save, sender=QuestionVariant)
+def bump_results_version_on_variant_change(sender, instance: QuestionVariant, **kwargs) -> None:
+    """
+    Make cached result pages of exam stale, when correct answers of its question may have changed.
+    There is no delete receiver: it would turn off fast cascade delete of variants. Variants deleted with question
+    are handled by question receivers, variants deleted on admin site bump version there
+    """
+    exam_id = Question.objects.filter(pk=instance.question_id).values_list('exam_id', flat=True).first()
+    if exam_id is not None:
+        ExamResultPage.bump_version(exam_id)
+
+
+@receiver(post_save, sender=Question)
+def bump_results_version_on_question_change(sender, instance: Question, created: bool, **kwargs) -> None:
+    """ Make cached result pages of exam stale, when text of its question is changed. New questions are not shown """
+    if not created:
+        ExamResultPage.bump_version(instance.exam_id)
+
+
+# Exam ids, which versions were bumped by deletion in progress in this thread
+deleting_exam_ids = threading.local()
+
+
+@receiver(request_started)
+def forget_deleting_exams(**kwargs) -> None:
+    """ Forget exams of deletions rolled back by previous request of this thread """
+    deleting_exam_ids.__dict__.pop('ids', None)
+
+
+@receiver(pre_delete, sender=Question)
+def bump_results_version_on_question_delete(sender, instance: Question, **kwargs) -> None:
+    """
+    Make cached result pages of exam stale, when its questions are deleted. Pre-delete signals of all
+    deleted questions are sent before any of them is deleted, so version is bumped once per exam
+    """
+    ids = deleting_exam_ids.__dict__.setdefault('ids', set())
+    if instance.exam_id not in ids:
+        ids.add(instance.exam_id)
+        ExamResultPage.bump_version(instance.exam_id)
+
+
+@receiver(post_delete, sender=Question)
+def forget_deleted_question_exam(sender, instance: Question, **kwargs) -> None:
+    """ Deletion of exam questions is done, next deletion bumps version again """
+    deleting_exam_ids.__dict__.get('ids', set()).discard(instance.exam_id)
@@ -0,0 +1,93 @@
+// Uploads big exam files in parts, resuming from the last stored part after network failures.
+(function () {
+    const form = document.getElementById('upload-form');
+    if (!form || !window.fetch) {
+        return;
+    }
+    const chunkSize = parseInt(form.dataset.chunkSize, 10);
+    const csrfToken = form.querySelector('[name=csrfmiddlewaretoken]').value;
+    const status = document.getElementById('upload-status');
+
+    async function sha256(blob) {
+        if (!window.crypto || !window.crypto.subtle) {
+            return '';
+        }
+        const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+        return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    async function request(url, options) {
+        options.headers = Object.assign({'X-CSRFToken': csrfToken}, options.headers || {});
+        let response = await fetch(url, options);
+        while (response.status === 429) {
+            const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 1;
+            await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+            response = await fetch(url, options);
+        }
+        const data = await response.json();
+        if (!response.ok && response.status !== 409) {
+            throw new Error(data.error || JSON.stringify(data.errors));
+        }
+        return data;
+    }
+
+    async function startUpload(file) {
+        const key = 'chunked-upload:' + [file.name, file.size, file.lastModified].join(':');
+        const savedId = window.localStorage.getItem(key);
+        if (savedId) {
+            try {
+                return await request(form.dataset.startUrl + savedId + '/', {method: 'GET'});
+            } catch (e) {
+                window.localStorage.removeItem(key);
+            }
+        }
+        const data = new FormData();
+        data.append('exam_title', form.elements.exam_title.value);
+        data.append('exam_source', form.elements.exam_source.value);
+        data.append('filename', file.name);
+        data.append('size', file.size);
+        data.append('checksum', await sha256(file));
+        const state = await request(form.dataset.startUrl, {method: 'POST', body: data});
+        window.localStorage.setItem(key, state.upload_id);
+        return state;
+    }
+
+    async function upload(file) {
+        let state = await startUpload(file);
+        let retries = 0;
+        while (state.offset < state.size) {
+            const chunk = file.slice(state.offset, state.offset + chunkSize);
+            status.textContent = 'Uploaded ' + Math.floor(state.offset / state.size * 100) + '%';
+            try {
+                state = await request(state.chunk_url, {
+                    method: 'PUT', body: chunk,
+                    headers: {'X-Upload-Offset': state.offset, 'X-Chunk-Checksum': await sha256(chunk)},
+                });
+                retries = 0;
+            } catch (e) {
+                if (++retries > 5) {
+                    throw e;
+                }
+                await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+                state = await request(state.chunk_url, {method: 'GET'});
+            }
+        }
+        const result = await request(state.complete_url, {method: 'POST'});
+        if (result.error) {
+            throw new Error(result.error);
+        }
+        window.localStorage.removeItem('chunked-upload:' + [file.name, file.size, file.lastModified].join(':'));
+        window.location = result.job_url;
+    }
+
+    form.addEventListener('submit', function (event) {
+        const file = form.elements.questions_file.files[0];
+        if (!file || file.size <= chunkSize) {
+            return;
+        }
+        event.preventDefault();
+        upload(file).catch(e => {
+            status.textContent = 'Upload failed: ' + e.message + '. Submit the form again to resume.';
+        });
+    });
+})();
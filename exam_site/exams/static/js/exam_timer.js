@@ -0,0 +1,48 @@
+// Shows time left of timed exam, autosaves answers on change and submits the form when time is out.
+// Deadline is enforced by server: answers sent too late are replaced with the last autosaved ones.
+(function () {
+    const form = document.getElementById('exam-form');
+    if (!form || !form.dataset.deadline) {
+        return;
+    }
+    const deadline = new Date(form.dataset.deadline).getTime();
+    const timeLeft = document.getElementById('exam-time-left');
+    const status = document.getElementById('exam-autosave-status');
+    let saveTimeout = null;
+    let submitted = false;
+
+    function autosave() {
+        if (!window.fetch) {
+            return;
+        }
+        fetch(form.dataset.autosaveUrl, {method: 'POST', body: new FormData(form)})
+            .then(response => {
+                status.textContent = response.ok ? 'Answers saved' : 'Time is out';
+            })
+            .catch(() => {
+                status.textContent = 'Answers are not saved, check connection';
+            });
+    }
+
+    form.addEventListener('change', () => {
+        clearTimeout(saveTimeout);
+        saveTimeout = setTimeout(autosave, 1000);
+    });
+    form.addEventListener('submit', () => {
+        submitted = true;
+    });
+
+    function tick() {
+        const seconds = Math.max(0, Math.round((deadline - Date.now()) / 1000));
+        timeLeft.textContent = Math.floor(seconds / 60) + ':' + String(seconds % 60).padStart(2, '0');
+        if (seconds === 0) {
+            if (!submitted) {
+                submitted = true;
+                form.submit();
+            }
+            return;
+        }
+        setTimeout(tick, 1000);
+    }
+    tick();
+})();
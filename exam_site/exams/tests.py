@@ -1,11 +1,42 @@
-from django.test import TestCase
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import tracemalloc
+from unittest import mock
+
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import Case, When
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import ApplicationUser, Exam
+from .management.commands.profile_startup import Command as ProfileStartupCommand
+from .models import (ApplicationUser, ChunkedUpload, Exam, ExamLayout, ExamResults, Job, Question, QuestionReport,
+                     QuestionVariant)
+from .modules.attempts import expire_attempts, start_attempt
+from .modules.assets import TemplateReferencedFinder, get_css_references, get_template_references
+from .modules.exams import ExamCreate
+from .modules.formats import CountingReader
+from .modules.export import ExamExport
+from .modules.jobs import JobQueue
+from .modules.layouts import ExamLayoutPool
+from .modules.paginators import EstimatedCountPaginator
+from .modules.regrading import Regrading
+from .modules.reports import ReportTriage
 
 
-def create_exam(title):
-    return Exam.objects.create(title=title, source='test')
+def create_exam(title, source='test'):
+    return Exam.objects.create(title=title, source=source)
 
 
 def create_user(username, password):
@@ -14,7 +45,14 @@ def create_user(username, password):
     return user
 
 
+def questions_json(number):
+    return [{'title': f'Q{i}', 'text': f'Question {i}?', 'answer_comment': '', 'answer': ['A'],
+             'variants': {'A': 'Yes', 'B': 'No'}} for i in range(number)]
+
+
 class IndexViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
 
     def test_index_no_exams(self):
         response = self.client.get(reverse('exams:index'))
@@ -28,8 +66,45 @@ class IndexViewTests(TestCase):
         response = self.client.get(reverse('exams:index'))
         self.assertQuerysetEqual(response.context['exam_list'], [exam1, exam2], ordered=False)
 
+    def test_index_is_cached_until_exams_change(self):
+        exam1 = create_exam('test_exam1')
+        self.client.get(reverse('exams:index'))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('exams:index'))
+        self.assertQuerysetEqual(response.context['exam_list'], [exam1])
+        exam1.title = 'renamed_exam'
+        exam1.save()
+        exam2 = create_exam('test_exam2')
+        response = self.client.get(reverse('exams:index'))
+        self.assertContains(response, 'renamed_exam')
+        self.assertQuerysetEqual(response.context['exam_list'], [exam1, exam2])
+        exam2.delete()
+        response = self.client.get(reverse('exams:index'))
+        self.assertQuerysetEqual(response.context['exam_list'], [exam1])
+
+    def test_exam_imported_by_worker_is_listed(self):
+        self.client.get(reverse('exams:index'))
+        # Worker process has its own cache: exam catalogue version is bumped in database
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                               'LOCATION': 'worker'}}):
+            exam = create_exam('imported_exam')
+        response = self.client.get(reverse('exams:index'))
+        self.assertQuerysetEqual(response.context['exam_list'], [exam])
+
+    def test_index_filters_and_pagination(self):
+        exams = [create_exam(f'test_exam{i:02}', source='book' if i % 2 else 'site') for i in range(30)]
+        response = self.client.get(reverse('exams:index'), data={'source': 'book', 'page': 2})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('exams:index'), data={'page': 2})
+        self.assertQuerysetEqual(response.context['exam_list'], exams[20:])
+        response = self.client.get(reverse('exams:index'), data={'source': 'book'})
+        self.assertQuerysetEqual(response.context['exam_list'], exams[1::2])
+
 
 class RegistrationViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_invalid_password(self):
         username = 'test_user'
         passwords = {'skvf9': 'This password is too short. It must contain at least 6 characters.',
@@ -50,6 +125,9 @@ class RegistrationViewTests(TestCase):
 
 
 class LoginLogoutViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_plain_get(self):
         response = self.client.get(reverse('exams:login'))
         self.assertEqual(response.status_code, 200)
@@ -76,3 +154,712 @@ class LoginLogoutViewTests(TestCase):
         response = self.client.post(reverse('exams:logout'))
         self.assertEqual(response.status_code, 302)
         self.assertRedirects(response, '/exams/login/')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.upload_dir.cleanup)
+
+    def enqueue_upload(self, contents):
+        path = os.path.join(self.upload_dir.name, 'questions.json')
+        with open(path, 'w') as file:
+            file.write(contents)
+        return JobQueue().enqueue(Job.KIND_UPLOAD, {'path': path, 'title': 'queued exam', 'source': 'test'})
+
+    def test_upload_job(self):
+        job = self.enqueue_upload(json.dumps(questions_json(3)))
+        job = JobQueue().run_next()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(job.percent_done, 100)
+        exam = Exam.objects.get(title='queued exam')
+        self.assertEqual(exam.question_number, 3)
+        self.assertEqual(QuestionVariant.objects.filter(question__exam=exam).count(), 6)
+        self.assertFalse(os.path.exists(job.payload['path']))
+        self.assertIsNone(JobQueue().run_next())
+
+    def test_failed_upload_job(self):
+        contents = questions_json(2)
+        contents[1]['answer'] = []
+        self.enqueue_upload(json.dumps(contents))
+        job = JobQueue().run_next()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn('No correct answer marked for question Q1', job.error)
+        self.assertFalse(Exam.objects.filter(title='queued exam').exists())
+
+    def test_stale_job_is_failed(self):
+        job = self.enqueue_upload(json.dumps(questions_json(1)))
+        JobQueue().claim_next()
+        self.assertEqual(JobQueue().fail_stale(), 0)
+        Job.objects.filter(pk=job.pk).update(heartbeat_on=timezone.now() - datetime.timedelta(hours=1))
+        call_command('run_jobs', once=True, stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.error, 'Worker stopped while job was running')
+        self.assertFalse(os.path.exists(job.payload['path']))
+
+    def test_stale_job_finished_later_stays_failed(self):
+        job = self.enqueue_upload(json.dumps(questions_json(1)))
+        job = JobQueue().claim_next()
+        Job.objects.filter(pk=job.pk).update(heartbeat_on=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(JobQueue().fail_stale(), 1)
+        job = JobQueue().run(job)
+        self.assertEqual((job.status, job.error), (Job.STATUS_FAILED, 'Worker stopped while job was running'))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.STATUS_FAILED)
+
+    def test_upload_view_queues_job(self):
+        admin = ApplicationUser.objects.create_user(username='app_admin', password='aif76sdvpg86dop',
+                                                    is_app_admin=True)
+        self.client.force_login(admin)
+        file = SimpleUploadedFile('questions.json', json.dumps(questions_json(1)).encode(),
+                                  content_type='application/json')
+        with override_settings(EXAM_UPLOAD_DIR=self.upload_dir.name):
+            response = self.client.post(reverse('exams:upload'), data={'exam_title': 'uploaded exam',
+                                                                       'questions_file': file})
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse('exams:job_status', kwargs={'pk': job.pk}))
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        self.assertFalse(Question.objects.exists())
+        response = self.client.get(reverse('exams:job_status', kwargs={'pk': job.pk}))
+        self.assertContains(response, 'uploaded exam')
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(upload_dir.cleanup)
+        settings_override = override_settings(EXAM_UPLOAD_DIR=upload_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        admin = ApplicationUser.objects.create_user(username='app_admin', password='aif76sdvpg86dop',
+                                                    is_app_admin=True)
+        self.client.force_login(admin)
+        self.contents = json.dumps(questions_json(20)).encode()
+
+    def start_upload(self):
+        response = self.client.post(reverse('exams:chunked_upload_start'), data={
+            'exam_title': 'chunked exam', 'filename': 'questions.json', 'size': len(self.contents),
+            'checksum': hashlib.sha256(self.contents).hexdigest()})
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put_chunk(self, state, chunk, offset=None, checksum=None):
+        return self.client.put(state['chunk_url'], data=chunk, content_type='application/octet-stream',
+                               HTTP_X_UPLOAD_OFFSET=state['offset'] if offset is None else offset,
+                               HTTP_X_CHUNK_CHECKSUM=checksum or hashlib.sha256(chunk).hexdigest())
+
+    def test_resumed_upload(self):
+        state = self.start_upload()
+        chunk_size = 700
+        first_chunk = self.contents[:chunk_size]
+        state = self.put_chunk(state, first_chunk).json()
+        self.assertEqual(state['offset'], chunk_size)
+
+        response = self.put_chunk(state, first_chunk, offset=0)
+        self.assertEqual(response.status_code, 409)
+        response = self.put_chunk(state, self.contents[chunk_size:2 * chunk_size], checksum='0' * 64)
+        self.assertEqual(response.status_code, 409)
+        response = self.client.post(state['complete_url'])
+        self.assertEqual(response.status_code, 409)
+
+        state = self.client.get(state['chunk_url']).json()
+        self.assertEqual(state['offset'], chunk_size)
+        while state['offset'] < state['size']:
+            state = self.put_chunk(state, self.contents[state['offset']:state['offset'] + chunk_size]).json()
+        response = self.client.post(state['complete_url'])
+        job = Job.objects.get()
+        self.assertEqual(response.json()['job_url'], reverse('exams:job_status', kwargs={'pk': job.pk}))
+        JobQueue().run_next()
+        self.assertEqual(Exam.objects.get(title='chunked exam').question_number, 20)
+
+    def test_deleted_job_keeps_upload_complete(self):
+        state = self.start_upload()
+        self.put_chunk(state, self.contents)
+        self.client.post(state['complete_url'])
+        Job.objects.all().delete()
+        self.assertEqual(self.put_chunk(state, self.contents, offset=0).status_code, 409)
+        self.assertEqual(self.client.post(state['complete_url']).status_code, 409)
+
+    def test_abandoned_upload_is_removed(self):
+        abandoned, active = self.start_upload(), self.start_upload()
+        self.put_chunk(abandoned, self.contents[:100])
+        upload = ChunkedUpload.objects.get(upload_id=abandoned['upload_id'])
+        ChunkedUpload.objects.filter(pk=upload.pk).update(updated_on=timezone.now() - datetime.timedelta(days=2))
+        call_command('run_jobs', once=True, stdout=io.StringIO())
+        self.assertEqual(list(ChunkedUpload.objects.values_list('upload_id', flat=True)), [active['upload_id']])
+        self.assertFalse(os.path.exists(upload.path))
+        self.assertEqual(self.put_chunk(abandoned, self.contents[100:200]).status_code, 404)
+
+    def test_upload_of_other_user(self):
+        state = self.start_upload()
+        self.client.force_login(ApplicationUser.objects.create_user(username='other_admin', password='aif76sdvpg8',
+                                                                    is_app_admin=True))
+        response = self.put_chunk(state, self.contents)
+        self.assertEqual(response.status_code, 404)
+
+
+class ExamFileFormatTests(TestCase):
+    def create_exam(self, contents, filename=''):
+        errors = ExamCreate().create_exam('formats exam', io.BytesIO(contents), 'test', filename=filename)
+        self.assertIsNone(errors)
+        return Exam.objects.get(title='formats exam')
+
+    def test_gzip_ndjson(self):
+        contents = '\n'.join(json.dumps(question) for question in questions_json(5)).encode()
+        exam = self.create_exam(gzip.compress(contents))
+        self.assertEqual(exam.question_number, 5)
+
+    def test_csv(self):
+        contents = ('title,text,answer_comment,answer,A,B,C\n'
+                    'Q1,"Pick one, please",,B,Yes,No,\n'
+                    'Q2,Pick two,Because,"A, C",One,Two,Three\n').encode()
+        exam = self.create_exam(contents, filename='questions.csv')
+        question = Question.objects.get(exam=exam, title='Q2')
+        self.assertEqual([(v.choice_letter, v.is_correct_answer) for v in question.answers.order_by('choice_letter')],
+                         [('A', True), ('B', False), ('C', True)])
+        self.assertEqual(Question.objects.get(exam=exam, title='Q1').answers.count(), 2)
+
+    def test_text_file_with_non_ascii_content(self):
+        contents = 'Übung ' * 1000
+        reader = CountingReader(io.StringIO(contents))
+        stream = io.BufferedReader(reader, 1024)
+        self.assertEqual(b''.join(iter(lambda: stream.read(10), b'')), contents.encode())
+        self.assertEqual(reader.bytes_read, len(contents.encode()))
+
+    def test_upload_exam_command(self):
+        with tempfile.NamedTemporaryFile(suffix='.jsonl') as file:
+            file.write('\n'.join(json.dumps(question) for question in questions_json(4)).encode())
+            file.flush()
+            call_command('upload_exam', file.name, title='command exam', source='test')
+        self.assertEqual(Exam.objects.get(title='command exam').question_number, 4)
+
+
+class ExamExportTests(TestCase):
+    def setUp(self):
+        contents = questions_json(7)
+        contents[3]['answer'] = ['A', 'B']
+        ExamCreate().create_exam('exported exam', io.BytesIO(json.dumps(contents).encode()), 'test')
+        self.exam = Exam.objects.get(title='exported exam')
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+
+    def assert_round_trip(self, file_format, compress=None):
+        call_command('export_exam', self.exam.pk, format=file_format, compress=compress,
+                     output_dir=self.output_dir.name, stdout=io.StringIO())
+        path = os.path.join(self.output_dir.name, ExamExport(file_format, compress).get_filename(self.exam))
+        with open(path, 'rb') as file:
+            self.assertIsNone(ExamCreate().create_exam(f'imported {file_format}', file, 'test'))
+        imported = Exam.objects.get(title=f'imported {file_format}')
+        self.assertEqual(list(ExamExport(chunk_size=3).iter_questions(imported)),
+                         list(ExamExport().iter_questions(self.exam)))
+
+    def test_json_round_trip(self):
+        self.assert_round_trip('json')
+
+    def test_compressed_ndjson_round_trip(self):
+        self.assert_round_trip('ndjson', 'gzip')
+
+    def test_csv_round_trip(self):
+        self.assert_round_trip('csv')
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.admin = ApplicationUser.objects.create_superuser(username='site_admin', password='aif76sdvpg86dop')
+        self.client.force_login(self.admin)
+
+    def add_questions(self, number):
+        ExamCreate().create_exam(f'admin exam {Exam.objects.count()}',
+                                 io.BytesIO(json.dumps(questions_json(number)).encode()), 'test')
+        for question in Question.objects.filter(questionreport__isnull=True):
+            QuestionReport.objects.create(question=question, reporter=self.admin, text='Typo')
+
+    def changelist_queries(self, model_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:exams_{model_name}_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow(self):
+        self.add_questions(2)
+        self.client.get(reverse('admin:index'))
+        query_counts = {model: self.changelist_queries(model) for model in ('question', 'questionvariant')}
+        self.add_questions(20)
+        for model, query_count in query_counts.items():
+            self.assertEqual(self.changelist_queries(model), query_count)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:exams_questionreport_changelist'))
+        self.assertFalse([query for query in queries if '"exams_question"."text"' in query['sql']])
+
+    def test_text_preview(self):
+        self.add_questions(3)
+        first, second, third = Question.objects.order_by('pk')
+        Question.objects.filter(pk=second.pk).update(text='x' * 100)
+        Question.objects.filter(pk=third.pk).update(text='y' * 101)
+        response = self.client.get(reverse('admin:exams_question_changelist'))
+        self.assertContains(response, '>' + 'x' * 100 + '<')
+        self.assertContains(response, '>' + 'y' * 100 + '...<')
+        self.assertNotContains(response, 'y' * 101)
+
+    def test_estimated_count(self):
+        self.add_questions(5)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        paginator = EstimatedCountPaginator(Question.objects.order_by('pk'), 10)
+        paginator.ESTIMATE_THRESHOLD = 1
+        with self.assertNumQueries(2):
+            self.assertEqual(paginator.count, 5)
+        filtered_paginator = EstimatedCountPaginator(Question.objects.filter(title='Q1').order_by('pk'), 10)
+        filtered_paginator.ESTIMATE_THRESHOLD = 1
+        self.assertEqual(filtered_paginator.count, 1)
+
+
+class ReportTriageTests(TestCase):
+    def setUp(self):
+        ExamCreate().create_exam('reported exam', io.BytesIO(json.dumps(questions_json(2)).encode()), 'test')
+        self.first_question, self.second_question = Question.objects.order_by('pk')
+        self.admin = ApplicationUser.objects.create_user(username='app_admin', password='aif76sdvpg86dop',
+                                                         is_app_admin=True)
+        self.reports = [QuestionReport.objects.create(question=question, reporter=self.admin, text=f'Report {i}')
+                        for i, question in enumerate([self.first_question] * 3 + [self.second_question])]
+
+    def test_fold_and_resolve(self):
+        resolved = QuestionReport.objects.create(question=self.second_question, reporter=self.admin, text='Old',
+                                                 status=QuestionReport.STATUS_REJECTED)
+        self.assertEqual(resolved.priority, QuestionReport.PRIORITY_RESOLVED)
+        self.assertEqual(ReportTriage().fold_duplicates(), 2)
+        queue = list(ReportTriage().queue())
+        self.assertEqual([report.pk for report in queue], [self.reports[3].pk, self.reports[0].pk, resolved.pk])
+        self.assertEqual(queue[1].duplicate_count, 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(ReportTriage().resolve([self.reports[0].pk], QuestionReport.STATUS_ACCEPTED, 'Fixed'), 3)
+        self.assertEqual(QuestionReport.objects.filter(status=QuestionReport.STATUS_ACCEPTED,
+                                                       priority=QuestionReport.PRIORITY_RESOLVED,
+                                                       resolution='Fixed').count(), 3)
+
+    def test_grouped_view_and_bulk_action(self):
+        self.client.force_login(self.admin)
+        self.client.post(reverse('exams:report_list_admin'),
+                         data={'action': 'fold', 'report_ids': [self.reports[1].pk]})
+        response = self.client.get(reverse('exams:report_list_admin'))
+        self.assertContains(response, '+2 duplicates')
+        response = self.client.get(reverse('exams:report_list_admin'), data={'group': 'question'})
+        questions = {row['question_id']: row for row in response.context['question_reports']}
+        self.assertEqual(questions[self.first_question.pk]['new_count'], 3)
+        self.assertEqual(questions[self.second_question.pk]['report_count'], 1)
+
+        response = self.client.post(reverse('exams:report_list_admin') + '?group=question', data={
+            'action': 'reject', 'question_ids': [self.first_question.pk], 'resolution': 'Not a bug'})
+        self.assertRedirects(response, reverse('exams:report_list_admin') + '?group=question')
+        self.assertEqual(QuestionReport.objects.filter(status=QuestionReport.STATUS_NEW).get(), self.reports[3])
+
+
+class RequestQueryFloorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = ApplicationUser.objects.create_user(username='floor_user', password='aif76sdvpg86dop')
+        self.client.post(reverse('exams:login'), data={'username': 'floor_user', 'password': 'aif76sdvpg86dop'})
+        self.client.get(reverse('exams:profile'))
+
+    def test_session_and_user_are_cached(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('exams:profile'))
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_exam_save_uses_request_user(self):
+        ExamCreate().create_exam('floor exam', io.BytesIO(json.dumps(questions_json(1)).encode()), 'test')
+        question = Question.objects.get()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('exams:exam_save', kwargs={'exam_id': question.exam_id}),
+                             data={str(question.pk): 'A'})
+        self.assertFalse([query for query in queries if 'FROM "exams_applicationuser"' in query['sql']])
+
+    def test_changed_user_is_reloaded(self):
+        self.user.set_password('changed_password1')
+        self.user.save()
+        response = self.client.get(reverse('exams:index'))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+
+class ExamLayoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        ApplicationUser.objects.create_user(username='layout_user', password='aif76sdvpg86dop')
+        self.client.post(reverse('exams:login'), data={'username': 'layout_user', 'password': 'aif76sdvpg86dop'})
+        contents = questions_json(12)
+        for question in contents:
+            question['variants'] = {'A': 'Yes', 'B': 'No', 'C': 'Maybe', 'D': 'Never'}
+        ExamCreate().create_exam('layout exam', io.BytesIO(json.dumps(contents).encode()), 'test')
+        self.exam = Exam.objects.get(title='layout exam')
+
+    def take_exam(self, question_quantity):
+        return self.client.post(reverse('exams:exam_take', kwargs={'exam_id': self.exam.pk}),
+                                data={'question_number': 'Fixed', 'question_quantity': question_quantity})
+
+    def test_generate_job(self):
+        job = JobQueue().enqueue(Job.KIND_GENERATE_LAYOUTS, {'exam_ids': [self.exam.pk], 'pool_size': 3})
+        self.assertEqual(JobQueue().run_next().status, Job.STATUS_DONE)
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.layout_pool_size, 3)
+        self.assertEqual(sorted(ExamLayout.objects.values_list('question_quantity', flat=True).distinct()),
+                         [5, 10, 12])
+        layout = ExamLayout.objects.filter(question_quantity=10).first()
+        self.assertEqual(len({question_id for question_id, _ in layout.layout}), 10)
+        self.assertTrue(all(sorted(letters) == list('ABCD') for _, letters in layout.layout))
+        self.assertEqual(Job.objects.get(pk=job.pk).progress, 1)
+
+    def test_take_exam_from_pool(self):
+        ExamLayoutPool(self.exam).generate(pool_size=1)
+        layout = ExamLayout.objects.get(question_quantity=5)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.take_exam(5)
+        self.assertEqual(response.context['layout'], layout)
+        self.assertEqual([question.pk for question in response.context['questions']],
+                         [question_id for question_id, _ in layout.layout])
+        self.assertEqual(len([query for query in queries if 'FROM "exams_questionvariant"' in query['sql']]), 1)
+
+    def test_take_exam_without_pool(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.take_exam(5)
+        self.assertIsNone(response.context['layout'])
+        self.assertEqual(len(response.context['questions']), 5)
+        self.assertEqual(len([query for query in queries if 'FROM "exams_questionvariant"' in query['sql']]), 1)
+
+    def test_answers_are_decoded(self):
+        ExamLayoutPool(self.exam).generate(pool_size=1)
+        layout = ExamLayout.objects.get(question_quantity=5)
+        answers = {str(question_id): ExamLayout.DISPLAY_LETTERS[letters.index('A')]
+                   for question_id, letters in layout.layout}
+        self.client.post(reverse('exams:exam_save', kwargs={'exam_id': self.exam.pk}),
+                         data={'layout': layout.signed_layout, **answers})
+        self.assertEqual(ExamResults.objects.get().score, 100)
+
+    def test_answers_survive_pool_regeneration(self):
+        ExamLayoutPool(self.exam).generate(pool_size=1)
+        response = self.take_exam(5)
+        layout = response.context['layout']
+        ExamLayoutPool(self.exam).generate(pool_size=1)
+        self.assertFalse(ExamLayout.objects.filter(pk=layout.pk).exists())
+        answers = {str(question_id): ExamLayout.DISPLAY_LETTERS[letters.index('A')]
+                   for question_id, letters in layout.layout}
+        signed_layout = re.search(r'name="layout" value="([^"]+)"', response.content.decode()).group(1)
+        response = self.client.post(reverse('exams:exam_save', kwargs={'exam_id': self.exam.pk}),
+                                    data={'layout': signed_layout, **answers})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ExamResults.objects.get().score, 100)
+
+    def test_tampered_layout_is_rejected(self):
+        ExamLayoutPool(self.exam).generate(pool_size=1)
+        signed_layout = ExamLayout.objects.get(question_quantity=5).signed_layout
+        response = self.client.post(reverse('exams:exam_save', kwargs={'exam_id': self.exam.pk}),
+                                    data={'layout': signed_layout + 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ExamResults.objects.exists())
+
+
+class StaticAssetsTests(TestCase):
+    def test_only_referenced_bundled_files_are_collected(self):
+        collected = {path for path, _ in TemplateReferencedFinder().list([])}
+        self.assertIn('bootstrap/css/bootstrap.min.css', collected)
+        self.assertIn('bootstrap/js/bootstrap.bundle.min.js', collected)
+        self.assertIn('js/chunked_upload.js', collected)
+        self.assertNotIn('bootstrap/css/bootstrap.css', collected)
+        self.assertNotIn('bootstrap/css/bootstrap.rtl.min.css', collected)
+        self.assertFalse([path for path in collected if path.endswith('.map')])
+
+    def test_template_references_exist(self):
+        references = get_template_references()
+        self.assertIn('admin/css/base.css', references)
+        self.assertEqual([path for path in references if not finders.find(path)], [])
+
+    def test_css_references(self):
+        contents = '@import url("fonts.css"); a{background:url(../img/a.png?v=1#x)} b{background:url(data:image/png)}'
+        self.assertEqual(get_css_references('admin/css/base.css', contents),
+                         {'admin/css/fonts.css', 'admin/img/a.png'})
+
+
+class ExamResultCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        ApplicationUser.objects.create_user(username='result_user', password='aif76sdvpg86dop')
+        self.client.post(reverse('exams:login'), data={'username': 'result_user', 'password': 'aif76sdvpg86dop'})
+        ExamCreate().create_exam('result exam', io.BytesIO(json.dumps(questions_json(3)).encode()), 'test')
+        self.exam = Exam.objects.get(title='result exam')
+        answers = {str(question_id): 'A' for question_id in Question.objects.values_list('pk', flat=True)}
+        self.url = self.client.post(reverse('exams:exam_save', kwargs={'exam_id': self.exam.pk}), data=answers).url
+
+    def test_results_are_rendered_once(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Question 3 of 3')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).content, response.content)
+        self.assertFalse([query for query in queries if 'exams_questionvariant' in query['sql']])
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_answer_change_invalidates_results(self):
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'images/cross.png')
+        variant = QuestionVariant.objects.filter(choice_letter='B').first()
+        variant.is_correct_answer = True
+        variant.save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertContains(changed, 'images/cross.png')
+
+    def test_question_delete_bumps_version_once(self):
+        ExamCreate().create_exam('deleted exam', io.BytesIO(json.dumps(questions_json(3)).encode()), 'test')
+        exam = Exam.objects.get(title='deleted exam')
+        with CaptureQueriesContext(connection) as queries:
+            Question.objects.filter(exam=exam).delete()
+        self.assertEqual(Exam.objects.get(pk=exam.pk).results_version, exam.results_version + 1)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE "exams_exam"')]), 1)
+        # Variants are deleted with one query, without loading them
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT')
+                          and 'FROM "exams_questionvariant"' in query['sql']])
+        Question.objects.create(exam=exam, title='Q', text='Q').delete()
+        self.assertEqual(Exam.objects.get(pk=exam.pk).results_version, exam.results_version + 2)
+
+    def test_regrade_in_worker_invalidates_results(self):
+        etag = self.client.get(self.url)['ETag']
+        # Worker process has its own cache: it changes only data in database
+        QuestionVariant.objects.filter(choice_letter='B').update(is_correct_answer=True)
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                               'LOCATION': 'worker'}}):
+            self.assertEqual(Regrading().regrade(exam_id=self.exam.pk), 1)
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertContains(changed, 'images/cross.png')
+
+
+class RegradingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = ApplicationUser.objects.create_superuser(username='regrade_admin', password='aif76sdvpg86dop')
+        self.client.force_login(self.admin)
+        ExamCreate().create_exam('regraded exam', io.BytesIO(json.dumps(questions_json(2)).encode()), 'test')
+        self.exam = Exam.objects.get(title='regraded exam')
+        self.first_question, self.second_question = Question.objects.order_by('pk')
+        for first_answer in ('A', 'B'):
+            self.client.post(reverse('exams:exam_save', kwargs={'exam_id': self.exam.pk}),
+                             data={str(self.first_question.pk): first_answer, str(self.second_question.pk): 'A'})
+        self.assertEqual(list(ExamResults.objects.order_by('pk').values_list('score', flat=True)), [100, 50])
+
+    def change_correct_answer(self):
+        QuestionVariant.objects.filter(question=self.first_question).update(
+            is_correct_answer=Case(When(choice_letter='B', then=True), default=False))
+
+    def test_regrade_changed_question(self):
+        self.change_correct_answer()
+        with self.assertNumQueries(6):
+            self.assertEqual(Regrading().regrade([self.first_question.pk]), 2)
+        self.assertEqual(list(ExamResults.objects.order_by('pk').values_list('score', flat=True)), [50, 100])
+        self.assertEqual(Regrading(batch_size=1).regrade(exam_id=self.exam.pk), 0)
+
+    def test_regrade_command(self):
+        self.change_correct_answer()
+        output = io.StringIO()
+        call_command('regrade', question_ids=[self.first_question.pk], batch_size=1, stdout=output)
+        self.assertIn('Regraded 2 of 2 attempts', output.getvalue())
+        self.assertEqual(list(ExamResults.objects.order_by('pk').values_list('score', flat=True)), [50, 100])
+
+    def test_admin_change_queues_regrading(self):
+        variant = QuestionVariant.objects.get(question=self.first_question, choice_letter='B')
+        self.client.post(reverse('admin:exams_questionvariant_change', args=[variant.pk]),
+                         data={'question': self.first_question.pk, 'choice_letter': 'B', 'text': 'No',
+                               'is_correct_answer': 'on'})
+        job = Job.objects.get(kind=Job.KIND_REGRADE)
+        self.assertEqual(job.payload, {'question_ids': [self.first_question.pk]})
+        self.assertEqual(JobQueue().run_next().status, Job.STATUS_DONE)
+        self.assertEqual(list(ExamResults.objects.order_by('pk').values_list('score', flat=True)), [50, 50])
+
+
+class LowMemoryIterationTests(TestCase):
+    def export_peak_memory(self, question_number):
+        ExamCreate().create_exam(f'large exam {question_number}',
+                                 io.BytesIO(json.dumps(questions_json(question_number)).encode()), 'test')
+        exam = Exam.objects.get(title=f'large exam {question_number}')
+        with open(os.devnull, 'wb') as file:
+            tracemalloc.start()
+            try:
+                self.assertEqual(ExamExport('ndjson', chunk_size=50).write(exam, file), question_number)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    def test_export_memory_is_flat(self):
+        small_peak = self.export_peak_memory(150)
+        large_peak = self.export_peak_memory(1500)
+        self.assertLess(large_peak, small_peak * 1.5)
+
+    def test_profile_history_is_paginated(self):
+        user = ApplicationUser.objects.create_user(username='history_user', password='aif76sdvpg86dop')
+        self.client.force_login(user)
+        ExamCreate().create_exam('history exam', io.BytesIO(json.dumps(questions_json(1)).encode()), 'test')
+        exam = Exam.objects.get(title='history exam')
+        ExamResults.objects.bulk_create([
+            ExamResults(exam=exam, user=user, unique_id=f'attempt_{i}',
+                        taken_on=datetime.datetime(2021, 1, 1, 0, i, tzinfo=datetime.timezone.utc))
+            for i in range(30)])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('exams:profile'))
+        self.assertEqual(len(response.context['exam_history']), 25)
+        self.assertContains(response, 'attempt_29')
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT "exams_exam"')])
+
+
+class TimedExamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = ApplicationUser.objects.create_user(username='timed_user', password='aif76sdvpg86dop')
+        self.client.force_login(self.user)
+        ExamCreate().create_exam('timed exam', io.BytesIO(json.dumps(questions_json(2)).encode()), 'test')
+        self.exam = Exam.objects.get(title='timed exam')
+        self.exam.duration_minutes = 10
+        self.exam.save()
+        self.first_question, self.second_question = Question.objects.order_by('pk')
+
+    def start(self):
+        response = self.client.post(reverse('exams:exam_take', kwargs={'exam_id': self.exam.pk}),
+                                    data={'question_number': 'All'})
+        return response.context['attempt']
+
+    def autosave(self, attempt, answers):
+        return self.client.post(reverse('exams:exam_autosave', kwargs={'exam_id': self.exam.pk,
+                                                                       'attempt_id': attempt.pk}), data=answers)
+
+    def submit(self, attempt, answers):
+        return self.client.post(reverse('exams:exam_save', kwargs={'exam_id': self.exam.pk}),
+                                data={'attempt': attempt.pk, **answers})
+
+    def expire(self, attempt):
+        ExamResults.objects.filter(pk=attempt.pk).update(deadline=timezone.now() - datetime.timedelta(minutes=5))
+
+    def test_submit_in_time(self):
+        attempt = self.start()
+        self.assertEqual(attempt.status, ExamResults.STATUS_IN_PROGRESS)
+        self.assertEqual(attempt.deadline - attempt.started_on, datetime.timedelta(minutes=10))
+        self.assertEqual(self.client.get(reverse('exams:exam_results', args=[self.exam.pk, attempt.unique_id]))
+                         .status_code, 404)
+        self.assertEqual(self.autosave(attempt, {str(self.first_question.pk): 'B'}).json(), {'saved': True})
+        self.assertEqual(ExamResults.objects.get().answers, {str(self.first_question.pk): ['B']})
+        response = self.submit(attempt, {str(self.first_question.pk): 'A', str(self.second_question.pk): 'A'})
+        self.assertEqual(self.client.get(response.url).status_code, 200)
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.score), (ExamResults.STATUS_FINISHED, 100))
+
+    def test_late_submission_uses_autosaved_answers(self):
+        attempt = self.start()
+        self.autosave(attempt, {str(self.first_question.pk): 'A', str(self.second_question.pk): 'B'})
+        self.expire(attempt)
+        self.assertEqual(self.autosave(attempt, {str(self.second_question.pk): 'A'}).status_code, 409)
+        self.submit(attempt, {str(self.first_question.pk): 'A', str(self.second_question.pk): 'A'})
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.score), (ExamResults.STATUS_FINISHED, 50))
+
+    def test_expiry_sweep(self):
+        expired_attempt = self.start()
+        other_user = ApplicationUser.objects.create_user(username='other_timed_user', password='aif76sdvpg86dop')
+        open_attempt = start_attempt(self.exam, other_user, [[self.first_question.pk, 'AB']])
+        self.autosave(expired_attempt, {str(self.first_question.pk): 'A'})
+        self.expire(expired_attempt)
+        self.assertEqual(expire_attempts(), 1)
+        expired_attempt.refresh_from_db()
+        # Question left unanswered is wrong
+        self.assertEqual((expired_attempt.status, expired_attempt.score), (ExamResults.STATUS_FINISHED, 50))
+        self.assertEqual(ExamResults.objects.get(pk=open_attempt.pk).status, ExamResults.STATUS_IN_PROGRESS)
+        with self.assertNumQueries(1):
+            self.assertEqual(expire_attempts(), 0)
+        self.submit(expired_attempt, {str(self.first_question.pk): 'B'})
+        self.assertEqual(ExamResults.objects.get(pk=expired_attempt.pk).score, 50)
+        response = self.client.get(reverse('exams:exam_results', args=[self.exam.pk, expired_attempt.unique_id]))
+        self.assertContains(response, 'Question 2 of 2')
+
+    def test_failed_recording_keeps_attempt_in_progress(self):
+        attempt = self.start()
+        self.autosave(attempt, {str(self.first_question.pk): 'A'})
+        self.expire(attempt)
+        with mock.patch('exams.modules.attempts.record_answers', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                expire_attempts()
+        self.assertEqual(ExamResults.objects.get(pk=attempt.pk).status, ExamResults.STATUS_IN_PROGRESS)
+        self.assertEqual(expire_attempts(), 1)
+        self.assertEqual(ExamResults.objects.get(pk=attempt.pk).score, 50)
+
+    def test_timed_exam_requires_attempt(self):
+        response = self.client.post(reverse('exams:exam_save', kwargs={'exam_id': self.exam.pk}),
+                                    data={str(self.first_question.pk): 'A', str(self.second_question.pk): 'A'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(ExamResults.objects.exists())
+
+    def test_open_attempt_is_continued(self):
+        attempt = self.start()
+        self.autosave(attempt, {str(self.first_question.pk): 'B'})
+        self.assertEqual(self.client.get(reverse('exams:exam_setup', kwargs={'exam_id': self.exam.pk}))
+                         .context['open_attempt'], attempt)
+        response = self.client.post(reverse('exams:exam_take', kwargs={'exam_id': self.exam.pk}), data={})
+        self.assertEqual(response.context['attempt'], attempt)
+        self.assertEqual([question.pk for question in response.context['questions']],
+                         [question_id for question_id, _ in attempt.questions])
+        selected = {question.pk: [variant.choice_letter for variant in question.answer_variants if variant.was_selected]
+                    for question in response.context['questions']}
+        self.assertEqual(selected, {self.first_question.pk: ['B'], self.second_question.pk: []})
+        self.assertEqual(ExamResults.objects.count(), 1)
+        self.expire(attempt)
+        next_attempt = self.start()
+        self.assertEqual(ExamResults.objects.get(pk=attempt.pk).status, ExamResults.STATUS_FINISHED)
+        self.assertEqual(ExamResults.objects.filter(status=ExamResults.STATUS_IN_PROGRESS).get(), next_attempt)
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(EXAM_RATE_LIMITS={'register': (2, 60)})
+    def test_register_is_limited_by_ip(self):
+        for status_code in (200, 200, 429):
+            response = self.client.post(reverse('exams:register'), data={'username': 'limited', 'password': '1'},
+                                        REMOTE_ADDR='10.0.0.1')
+            self.assertEqual(response.status_code, status_code)
+        self.assertEqual(response['Retry-After'], '30')
+        response = self.client.post(reverse('exams:register'), data={'username': 'limited', 'password': '1'},
+                                    REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('exams:register'), REMOTE_ADDR='10.0.0.1').status_code, 200)
+
+    @override_settings(EXAM_RATE_LIMITS={'exam_save': (1, 60)})
+    def test_exam_save_is_limited_by_user(self):
+        ExamCreate().create_exam('limited exam', io.BytesIO(json.dumps(questions_json(1)).encode()), 'test')
+        question = Question.objects.get()
+        url = reverse('exams:exam_save', kwargs={'exam_id': question.exam_id})
+        for username in ('first_limited', 'second_limited'):
+            self.client.force_login(ApplicationUser.objects.create_user(username=username, password='aif76sdvpg86dop'))
+            self.assertEqual(self.client.post(url, data={str(question.pk): 'A'}).status_code, 302)
+        self.assertEqual(self.client.post(url, data={str(question.pk): 'A'}).status_code, 429)
+        self.assertEqual(ExamResults.objects.count(), 2)
+
+
+class StartupProfileTests(TestCase):
+    def test_cli_settings_skip_admin_and_static_apps(self):
+        from exam_site import settings_cli
+        self.assertIn('exams.apps.ExamsConfig', settings_cli.INSTALLED_APPS)
+        for app in ('django.contrib.admin', 'django.contrib.messages', 'django.contrib.staticfiles'):
+            self.assertNotIn(app, settings_cli.INSTALLED_APPS)
+        self.assertFalse(any('messages' in middleware for middleware in settings_cli.MIDDLEWARE))
+
+    def test_import_times_are_summed_by_package(self):
+        stderr = 'import time: self [us] | cumulative | imported package\n' \
+                 'import time:       100 |        100 |     django.contrib.admin.sites\n' \
+                 'import time:        50 |        150 |   django.contrib.admin\n' \
+                 'import time:        20 |         20 | exams\n'
+        self.assertEqual(ProfileStartupCommand.parse_import_times(stderr),
+                         {'django.contrib.admin': 150, 'exams': 20})
@@ -10,6 +10,13 @@ urlpatterns = [
     path('logout/', views.Logout.as_view(), name='logout'),
     path('register/', views.register, name='register'),
     path('admin/upload/', views.UploadView.as_view(), name='upload'),
+    path('admin/upload/chunked/', views.ChunkedUploadStartView.as_view(), name='chunked_upload_start'),
+    path('admin/upload/chunked/<str:upload_id>/', views.ChunkedUploadChunkView.as_view(),
+         name='chunked_upload_chunk'),
+    path('admin/upload/chunked/<str:upload_id>/complete/', views.ChunkedUploadCompleteView.as_view(),
+         name='chunked_upload_complete'),
+    path('admin/jobs/', views.JobListView.as_view(), name='job_list'),
+    path('admin/jobs/<int:pk>/', views.JobStatusView.as_view(), name='job_status'),
     path('admin/reports/', views.QuestionReportListViewAdmin.as_view(), name='report_list_admin'),
     path('admin/reports/<int:pk>/', views.QuestionReportViewAdmin.as_view(), name='report_details_admin'),
     path('healthcheck/', views.health_check_view, name='healthcheck'),
@@ -20,5 +27,6 @@ urlpatterns = [
     path('<exam_id>/setup/', views.ExamSetupView.as_view(), name='exam_setup'),
     path('<exam_id>/take/', views.ExamTakeView.as_view(), name='exam_take'),
     path('<exam_id>/save/', views.ExamSave.as_view(), name='exam_save'),
+    path('<exam_id>/attempts/<int:attempt_id>/autosave/', views.ExamAutosaveView.as_view(), name='exam_autosave'),
     path('<exam_id>/<str:exam_record_datetime>/', views.ExamResultView.as_view(), name='exam_results'),
 ]
@@ -1,28 +1,59 @@
 import random
-from typing import Dict, List
+from typing import Dict, List, Optional
 
+from django.conf import settings
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.password_validation import validate_password
-from django.core.exceptions import ValidationError, PermissionDenied
+from django.core import signing
+from django.core.exceptions import ValidationError, PermissionDenied, SuspiciousOperation
 from django.core.handlers.wsgi import WSGIRequest
-from django.db.models import QuerySet, Case, When, Value
-from django.http import HttpResponseRedirect, HttpResponse
-from django.shortcuts import render, redirect
+from django.db.models import QuerySet
+from django.http import HttpResponseRedirect, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
 from django.views import generic
 
 from . import forms
 from . import models
+from .modules.attempts import finish_attempt, get_open_attempt, record_answers, save_answers, start_attempt
+from .modules.catalogue import ExamCatalogue
+from .modules.layouts import ExamLayoutPool
+from .modules.ratelimit import rate_limit
+from .modules.reports import ReportTriage
+from .modules.results import ExamResultPage
+from .modules.uploads import ChunkedUploadError, complete_chunked_upload, write_chunk
 
 
-class IndexView(generic.ListView):
+class PaginationQueryMixin:
+    """ Adds query string of current filters without page number to context, for pagination links """
+
+    def get_context_data(self, **kwargs) -> Dict:
+        context = super(PaginationQueryMixin, self).get_context_data(**kwargs)
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        context['filter_query'] = query.urlencode()
+        return context
+
+
+class IndexView(PaginationQueryMixin, generic.ListView):
     """ View for index page of the application"""
     template_name = 'exams/index.html'
     context_object_name = 'exam_list'
+    paginate_by = 20
 
-    def get_queryset(self) -> QuerySet:
-        """ Returns list of all exams """
-        return models.Exam.objects.all()
+    def get_queryset(self) -> ExamCatalogue:
+        """ Returns cached list of exams, optionally filtered by source or uploader """
+        return ExamCatalogue(source=self.request.GET.get('source'), uploader=self.request.GET.get('uploader'))
+
+    def get_context_data(self, **kwargs) -> Dict:
+        """ Adds applied filters to context """
+        context = super(IndexView, self).get_context_data(**kwargs)
+        context['source'] = self.object_list.source
+        context['uploader'] = self.object_list.uploader
+        return context
 
 
 class Login(LoginView):
@@ -37,6 +68,7 @@ class Logout(LogoutView):
     next_page = 'exams:login'
 
 
+@rate_limit('register')
 def register(request: WSGIRequest) -> HttpResponse:
     """
     View for register page.
@@ -73,14 +105,17 @@ class AppAdminPermissionsCheckMixin:
         return super(AppAdminPermissionsCheckMixin, self).dispatch(request, *args, **kwargs)
 
 
-class ProfileView(generic.DetailView):
+class ProfileView(PaginationQueryMixin, generic.ListView):
+    """ View to show current user's exam history """
     template_name = 'exams/profile.html'
-    model = models.ApplicationUser
+    context_object_name = 'exam_history'
+    paginate_by = 25
 
-    def get(self, request, *args, **kwargs):
-        exam_history = models.ExamResults.objects.filter(user=request.user).order_by('-taken_on')
-        context = {'exam_history': exam_history}
-        return render(request, 'exams/profile.html', context=context)
+    def get_queryset(self) -> QuerySet:
+        """ Return page of user's exam results, newest first, with exam titles selected in the same query """
+        return models.ExamResults.objects.filter(user=self.request.user, status=models.ExamResults.STATUS_FINISHED) \
+            .select_related('exam') \
+            .only('unique_id', 'taken_on', 'score', 'exam__id', 'exam__title').order_by('-taken_on')
 
 
 class ExamSetupView(generic.FormView):
@@ -96,6 +131,8 @@ class ExamSetupView(generic.FormView):
         context = super().get_context_data(**kwargs)
         context['exam'] = exam
         context['question_number_preconfigs'] = self.get_question_number_preconfigs()
+        if exam.duration_minutes and self.request.user.is_authenticated:
+            context['open_attempt'] = get_open_attempt(exam, self.request.user)
         return context
 
     @staticmethod
@@ -120,12 +157,18 @@ class ExamTakeView(generic.View):
         """
         Handle POST request. Return exam data in response. If question_quantity is less that amount of questions
         in the exam - return question_quantity of random questions.
+        Questions are taken from random pre-generated layout if exam has them, sampled otherwise.
+        Timed attempt, which user has in progress, is shown again with its autosaved answers, e.g. after page reload.
         Adds to each question_json
-            - answer variants
+            - answer variants with letters to show them with
             - boolean indicating whether number of correct answers is 1 or more
         """
         exam_id = int(exam_id)
         exam = models.Exam.objects.get(id=exam_id)
+        if exam.duration_minutes:
+            attempt = get_open_attempt(exam, request.user)
+            if attempt is not None:
+                return self.render_attempt(request, exam, attempt)
         if request.POST['question_number'] == 'Custom':
             question_quantity = int(request.POST['question_quantity_custom'])
         elif request.POST['question_number'] == 'All':
@@ -133,22 +176,87 @@ class ExamTakeView(generic.View):
         else:
             question_quantity = int(request.POST['question_quantity'])
 
-        questions = models.Question.objects.filter(exam_id=exam_id)
-        total_question_number = questions.count()
-        if question_quantity < total_question_number:
-            questions = random.sample(list(questions), question_quantity)
-
+        layout = ExamLayoutPool(exam).pick(question_quantity)
+        questions = self.get_layout_questions(layout) if layout else None
+        if questions is None:
+            layout = None
+            questions = self.get_random_questions(exam_id, question_quantity)
+
+        attempt = None
+        if exam.duration_minutes:
+            served_questions = layout.layout if layout else [
+                [question.pk, ''.join(variant.choice_letter for variant in question.answer_variants)]
+                for question in questions]
+            attempt = start_attempt(exam, request.user, served_questions)
+            if attempt is None:
+                # Attempt was started by concurrent request
+                attempt = get_open_attempt(exam, request.user)
+                if attempt is None:
+                    return HttpResponse('Exam attempt could not be started, please try again.', status=409)
+                return self.render_attempt(request, exam, attempt)
+        return self.render_questions(request, exam, questions, layout, attempt)
+
+    def render_questions(self, request: WSGIRequest, exam: models.Exam, questions: List[models.Question],
+                         layout: Optional[models.ExamLayout], attempt: Optional[models.ExamResults]) -> HttpResponse:
+        """ Render exam page with given questions """
+        for question in questions:
+            correct_answers_num = sum(variant.is_correct_answer for variant in question.answer_variants)
+            question.has_one_correct_answer = correct_answers_num == 1
+        context = {'exam': exam, 'questions': questions, 'layout': layout, 'attempt': attempt}
+        return render(request, self.template_name, context=context)
+
+    def render_attempt(self, request: WSGIRequest, exam: models.Exam, attempt: models.ExamResults) -> HttpResponse:
+        """ Render questions served to timed attempt in the same order, with autosaved answers selected """
+        layout = models.ExamLayout(exam=exam, question_quantity=len(attempt.questions), layout=attempt.questions)
+        questions = self.get_layout_questions(layout)
+        if questions is None:
+            return HttpResponse('Exam questions were changed, your answers are submitted at the deadline.',
+                                status=409)
         for question in questions:
-            question_id = question.id
-            answer_variants = models.QuestionVariant.objects.filter(question__id=question_id)
-            correct_answers_num = models.QuestionVariant.objects.filter(
-                question__id=question_id, is_correct_answer=True).count()
-            has_one_correct_answer = correct_answers_num == 1
-            question.answer_variants = answer_variants
-            question.has_one_correct_answer = has_one_correct_answer
+            selected = attempt.answers.get(str(question.pk), [])
+            for variant in question.answer_variants:
+                variant.was_selected = variant.choice_letter in selected
+        return self.render_questions(request, exam, questions, layout, attempt)
 
-        context = {'exam': exam, 'questions': questions}
-        return render(request, 'exams/exam_take.html', context=context)
+    @staticmethod
+    def get_answer_variants(question_ids: List[int]) -> Dict[int, List[models.QuestionVariant]]:
+        """ Returns answer variants of questions in one query, grouped by question id """
+        variants = {}
+        for variant in models.QuestionVariant.objects.filter(question_id__in=question_ids).order_by('choice_letter'):
+            variant.display_letter = variant.choice_letter
+            variants.setdefault(variant.question_id, []).append(variant)
+        return variants
+
+    def get_random_questions(self, exam_id: int, question_quantity: int) -> List[models.Question]:
+        """ Returns question_quantity of random exam questions with answer variants """
+        question_ids = list(models.Question.objects.filter(exam_id=exam_id).values_list('pk', flat=True))
+        if question_quantity < len(question_ids):
+            question_ids = random.sample(question_ids, question_quantity)
+        questions = models.Question.objects.in_bulk(question_ids)
+        variants = self.get_answer_variants(question_ids)
+        for question_id, question in questions.items():
+            question.answer_variants = variants.get(question_id, [])
+        return [questions[question_id] for question_id in question_ids]
+
+    def get_layout_questions(self, layout: models.ExamLayout) -> Optional[List[models.Question]]:
+        """
+        Returns questions of pre-generated layout with answer variants in layout order, lettered in display order.
+        Returns None if questions were changed after layout was generated
+        """
+        question_ids = [question_id for question_id, _ in layout.layout]
+        questions = models.Question.objects.in_bulk(question_ids)
+        variants = self.get_answer_variants(question_ids)
+        layout_questions = []
+        for question_id, letters in layout.layout:
+            question_variants = {variant.choice_letter: variant for variant in variants.get(question_id, [])}
+            if question_id not in questions or sorted(letters) != sorted(question_variants):
+                return None
+            question = questions[question_id]
+            question.answer_variants = [question_variants[letter] for letter in letters]
+            for display_letter, variant in zip(models.ExamLayout.DISPLAY_LETTERS, question.answer_variants):
+                variant.display_letter = display_letter
+            layout_questions.append(question)
+        return layout_questions
 
 
 class ExamResultView(generic.View):
@@ -156,63 +264,82 @@ class ExamResultView(generic.View):
     template_name = 'exams/exam_result.html'
 
     def get(self, request: WSGIRequest, exam_id: str, exam_record_datetime: str) -> HttpResponse:
-        """ Return exam results """
-        exam = models.Exam.objects.get(id=exam_id)
-        exam_record = models.ExamResults.objects.get(exam=exam, unique_id=exam_record_datetime)
+        """
+        Return exam results. Finished attempt doesn't change, so questions are rendered once and taken from cache,
+        and browser gets immutable response with ETag, which changes only when exam answers are changed
+        """
+        exam_record = get_object_or_404(models.ExamResults.objects.select_related('exam'), exam_id=exam_id,
+                                        unique_id=exam_record_datetime, status=models.ExamResults.STATUS_FINISHED)
         # TODO Check user permissions to access this exam record
-        question_records = models.QuestionRecorded.objects.filter(exam_result=exam_record)
-        questions = []
-        for question_record in question_records:
-            question = models.Question.objects.get(id=question_record.question.id)
-            is_answer_correct = True
-            answer_variants = models.QuestionVariant.objects.filter(question=question)
-            for answer_variant in answer_variants:
-                answer_record = models.QuestionVariantAnswerRecorded.objects.get(
-                    question_recorded=question_record, question_variant=answer_variant)
-                answer_variant.was_selected = answer_record.was_selected
-                if answer_variant.was_selected ^ answer_variant.is_correct_answer:
-                    is_answer_correct = False
-            question.answer_variants = answer_variants
-            question.is_answer_correct = is_answer_correct
-            questions.append(question)
-        context = {'exam': exam, 'exam_record': exam_record, 'questions': questions}
-        return render(request, 'exams/exam_results.html', context=context)
-
-
+        result_page = ExamResultPage(exam_record)
+        etag = f'"{result_page.get_etag(request.user.pk)}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            context = {'exam': exam_record.exam, 'exam_record': exam_record,
+                       'questions_html': mark_safe(result_page.render())}
+            response = render(request, 'exams/exam_results.html', context=context)
+            response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=settings.EXAM_RESULTS_MAX_AGE, immutable=True)
+        return response
+
+
+def get_posted_answers(request: WSGIRequest, exam_id: str) -> Dict[int, List[str]]:
+    """
+    Returns answers from exam form by question id, with choice letters of pre-generated layout decoded.
+    Layout is taken from signed copy posted with the form, as pool may be regenerated while exam is taken
+    """
+    answers = {int(question_id): request.POST.getlist(question_id)
+               for question_id in request.POST.keys()
+               if question_id.isdigit()}
+    if request.POST.get('layout'):
+        try:
+            layout = models.ExamLayout.from_signed_layout(request.POST['layout'], int(exam_id))
+        except signing.BadSignature:
+            raise SuspiciousOperation('Exam layout signature is invalid')
+        answers = layout.decode_answers(answers)
+    return answers
+
+
+@method_decorator(rate_limit('exam_save'), name='dispatch')
 class ExamSave(generic.View):
     """ View for exam results saving """
 
     def post(self, request: WSGIRequest, exam_id: str) -> HttpResponse:
-        """ Get exam results, store in database and redirect to exam results view """
-        answers = {int(question_id): request.POST.getlist(question_id)
-                   for question_id in request.POST.keys()
-                   if 'csrf' not in question_id}
-        exam = models.Exam.objects.get(id=exam_id)
-        user = models.ApplicationUser.objects.get(id=request.user.id)
-        exam_results = models.ExamResults.objects.create(exam=exam, user=user)
-        total_questions_in_exam = len(answers)
-        questions_with_correct_answers = 0
-        for question in models.Question.objects.filter(id__in=answers.keys()):
-            question_record = models.QuestionRecorded.objects.create(exam_result=exam_results, question=question)
-            is_answer_correct = True
-            for answer_variant in models.QuestionVariant.objects.filter(question__id=question.id):
-                was_selected = answer_variant.choice_letter in answers[question.id]
-                variant_record = models.QuestionVariantAnswerRecorded.objects.create(
-                    question_variant=answer_variant, question_recorded=question_record, was_selected=was_selected)
-                if answer_variant.is_correct_answer ^ variant_record.was_selected:
-                    is_answer_correct = False
-            if is_answer_correct:
-                questions_with_correct_answers += 1
-        exam_results.score = int(questions_with_correct_answers / total_questions_in_exam * 100)
-        exam_results.save(update_fields=['score'])
+        """
+        Get exam results, store in database and redirect to exam results view.
+        Timed attempt submitted after deadline is finished with answers autosaved before it
+        """
+        answers = get_posted_answers(request, exam_id)
+        if request.POST.get('attempt'):
+            exam_results = get_object_or_404(models.ExamResults, pk=request.POST['attempt'], exam_id=exam_id,
+                                             user=request.user)
+            if exam_results.status == models.ExamResults.STATUS_IN_PROGRESS:
+                finish_attempt(exam_results, answers)
+        else:
+            exam = models.Exam.objects.get(id=exam_id)
+            if exam.duration_minutes:
+                raise PermissionDenied('Timed exam is submitted only with its attempt')
+            exam_results = models.ExamResults.objects.create(exam=exam, user=request.user)
+            record_answers(exam_results, answers)
         return redirect(reverse('exams:exam_results', kwargs={'exam_id': exam_id,
-                                                              'exam_record_datetime': exam_results.taken_on_as_str}))
+                                                              'exam_record_datetime': exam_results.unique_id}))
+
+
+@method_decorator(rate_limit('exam_autosave', json=True), name='dispatch')
+class ExamAutosaveView(generic.View):
+    """ View saving answers of timed attempt in progress, called by exam page script """
 
+    def post(self, request: WSGIRequest, exam_id: str, attempt_id: int) -> JsonResponse:
+        """ Save answers. Responds with 409 if attempt is finished or its deadline has passed """
+        if not save_answers(attempt_id, request.user, get_posted_answers(request, exam_id)):
+            return JsonResponse({'saved': False}, status=409)
+        return JsonResponse({'saved': True})
 
+
+@method_decorator(rate_limit('upload'), name='dispatch')
 class UploadView(AppAdminPermissionsCheckMixin, generic.FormView):
     template_name = 'exams/upload.html'
     form_class = forms.UploadForm
-    success_url = reverse_lazy('exams:index')
 
     def get_form_kwargs(self) -> Dict:
         """ Pass arguments to form within kwargs """
@@ -220,6 +347,103 @@ class UploadView(AppAdminPermissionsCheckMixin, generic.FormView):
         kwargs['user'] = self.request.user
         return kwargs
 
+    def get_context_data(self, **kwargs) -> Dict:
+        """ Files bigger than a chunk are sent by upload script in parts """
+        context = super(UploadView, self).get_context_data(**kwargs)
+        context['chunk_size'] = settings.EXAM_UPLOAD_CHUNK_SIZE
+        return context
+
+    def form_valid(self, form) -> HttpResponse:
+        """ Queue exam import and redirect to its status page """
+        job = form.enqueue()
+        return redirect(reverse('exams:job_status', kwargs={'pk': job.pk}))
+
+
+class ChunkedUploadMixin(AppAdminPermissionsCheckMixin):
+    """ Common methods of chunked upload endpoints, which communicate with upload script in JSON """
+
+    def get_upload(self) -> models.ChunkedUpload:
+        """ Return upload started by current user """
+        return get_object_or_404(models.ChunkedUpload, upload_id=self.kwargs['upload_id'], owner=self.request.user)
+
+    @staticmethod
+    def upload_state(upload: models.ChunkedUpload) -> Dict:
+        """ Return data client needs to continue upload """
+        return {'upload_id': upload.upload_id, 'offset': upload.offset, 'size': upload.size,
+                'chunk_url': reverse('exams:chunked_upload_chunk', kwargs={'upload_id': upload.upload_id}),
+                'complete_url': reverse('exams:chunked_upload_complete', kwargs={'upload_id': upload.upload_id})}
+
+
+@method_decorator(rate_limit('chunked_upload', json=True), name='dispatch')
+class ChunkedUploadStartView(ChunkedUploadMixin, generic.View):
+    """ View to start upload of exam file in several parts """
+
+    def post(self, request: WSGIRequest) -> HttpResponse:
+        """ Register upload and return URLs to send its parts to """
+        form = forms.ChunkedUploadStartForm(request.POST)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        upload = form.start(request.user)
+        return JsonResponse(self.upload_state(upload), status=201)
+
+
+@method_decorator(rate_limit('chunked_upload', methods=('PUT',), json=True), name='dispatch')
+class ChunkedUploadChunkView(ChunkedUploadMixin, generic.View):
+    """ View to receive parts of uploaded file """
+
+    def get(self, request: WSGIRequest, upload_id: str) -> HttpResponse:
+        """ Return offset to resume upload from """
+        return JsonResponse(self.upload_state(self.get_upload()))
+
+    def put(self, request: WSGIRequest, upload_id: str) -> HttpResponse:
+        """
+        Write request body to upload file without buffering it in memory.
+        Offset of the part is passed in X-Upload-Offset header, its SHA-256 in optional X-Chunk-Checksum header
+        """
+        upload = self.get_upload()
+        try:
+            offset = int(request.headers['X-Upload-Offset'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'X-Upload-Offset header and body length are required.'}, status=400)
+        try:
+            write_chunk(upload, offset, request, length, request.headers.get('X-Chunk-Checksum', ''))
+        except ChunkedUploadError as e:
+            return JsonResponse({'error': str(e), **self.upload_state(upload)}, status=409)
+        return JsonResponse(self.upload_state(upload))
+
+
+@method_decorator(rate_limit('chunked_upload', json=True), name='dispatch')
+class ChunkedUploadCompleteView(ChunkedUploadMixin, generic.View):
+    """ View to finish chunked upload and pass the file to importer """
+
+    def post(self, request: WSGIRequest, upload_id: str) -> HttpResponse:
+        """ Verify file and return URL of import job status page """
+        upload = self.get_upload()
+        try:
+            job = complete_chunked_upload(upload)
+        except ChunkedUploadError as e:
+            return JsonResponse({'error': str(e), **self.upload_state(upload)}, status=409)
+        return JsonResponse({'job_url': reverse('exams:job_status', kwargs={'pk': job.pk})})
+
+
+class JobListView(AppAdminPermissionsCheckMixin, generic.ListView):
+    """ View to show latest background jobs """
+    template_name = 'exams/job_list.html'
+    context_object_name = 'jobs'
+    jobs_shown = 50
+
+    def get_queryset(self) -> QuerySet:
+        """ Return latest jobs, newest first """
+        return models.Job.objects.select_related('created_by').order_by('-created_on', '-pk')[:self.jobs_shown]
+
+
+class JobStatusView(AppAdminPermissionsCheckMixin, generic.DetailView):
+    """ View to show background job progress, status and errors """
+    template_name = 'exams/job_status.html'
+    model = models.Job
+    context_object_name = 'job'
+
 
 class QuestionReportCreateView(generic.FormView):
     """ View to create question report """
@@ -265,30 +489,71 @@ class QuestionReportViewAdmin(AppAdminPermissionsCheckMixin, generic.UpdateView)
         """ Redirect to the same page after update """
         return self.request.path
 
+    def form_valid(self, form) -> HttpResponse:
+        """ Save report and resolve reports folded into it the same way """
+        response = super(QuestionReportViewAdmin, self).form_valid(form)
+        if self.object.is_resolved:
+            ReportTriage().resolve([self.object.pk], self.object.status, self.object.resolution)
+        return response
+
 
-class QuestionReportListView(generic.ListView):
+class QuestionReportListView(PaginationQueryMixin, generic.ListView):
     """ View to show current user's reports """
     template_name = 'exams/question_report_list_user.html'
     context_object_name = 'question_reports'
+    paginate_by = 25
 
     def get_queryset(self) -> QuerySet:
-        """ Return all reports submitted by current user """
+        """ Return all reports submitted by current user, newest first """
         user = self.request.user
-        user_reports = models.QuestionReport.objects.filter(reporter=user)
+        user_reports = models.QuestionReport.objects.filter(reporter=user).select_related('question__exam') \
+            .defer('question__text', 'question__answer_explanation').order_by('-reported_on')
         return user_reports
 
 
-class QuestionReportListViewAdmin(AppAdminPermissionsCheckMixin, generic.ListView):
-    """ View to show all reports to user """
+class QuestionReportListViewAdmin(AppAdminPermissionsCheckMixin, PaginationQueryMixin, generic.ListView):
+    """
+    View to show report triage queue to admin.
+    Reports may be filtered by status and exam, grouped by question and resolved or folded in bulk
+    """
     template_name = 'exams/question_report_list_admin.html'
     context_object_name = 'question_reports'
+    paginate_by = 25
+
+    @property
+    def is_grouped(self) -> bool:
+        """ Whether reported questions are shown instead of separate reports """
+        return self.request.GET.get('group') == 'question'
+
+    def get_filters(self) -> Dict:
+        """ Returns status and exam filters from query string """
+        exam_id = self.request.GET.get('exam', '')
+        return {'status': self.request.GET.get('status') or None,
+                'exam_id': int(exam_id) if exam_id.isdigit() else None}
 
     def get_queryset(self) -> QuerySet:
-        """ Return all reports """
-        user_reports = models.QuestionReport.objects.all().order_by(
-            Case(When(status=models.QuestionReport.STATUS_NEW, then=Value(0)), default=Value(1))
-        )
-        return user_reports
+        """ Return new reports first, or questions with most new reports first if grouped by question """
+        triage = ReportTriage()
+        if self.is_grouped:
+            return triage.questions(**self.get_filters())
+        return triage.queue(**self.get_filters())
+
+    def get_context_data(self, **kwargs) -> Dict:
+        """ Adds filter values and bulk action choices to context """
+        context = super(QuestionReportListViewAdmin, self).get_context_data(**kwargs)
+        context['is_grouped'] = self.is_grouped
+        context['filters'] = self.get_filters()
+        context['status_values'] = models.QuestionReport.STATUS_VALUES
+        context['exams'] = models.Exam.objects.only('pk', 'title').order_by('title')
+        context['bulk_actions'] = forms.ReportBulkActionForm.ACTION_VALUES
+        return context
+
+    def post(self, request: WSGIRequest) -> HttpResponse:
+        """ Apply bulk action to selected reports or questions and return to the same page """
+        form = forms.ReportBulkActionForm(request.POST)
+        if form.is_valid():
+            form.apply()
+        return redirect(request.get_full_path())
 
 
 def health_check_view(request: WSGIRequest) -> HttpResponse:
@@ -0,0 +1,28 @@
+"""
+Gunicorn configuration of production profile: gunicorn -c gunicorn.conf.py exam_site.wsgi
+Every value can be overridden with environment variable
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Threaded workers: requests mostly wait for database, so several threads share one process memory
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Workers are restarted gracefully after serving max_requests, so memory growth of a process is bounded.
+# Jitter spreads restarts, so workers don't restart at the same time
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Application is loaded before workers are forked, they share its memory pages
+preload_app = True
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'